@@ -0,0 +1,117 @@
+# Test/bench_memory.py
+"""
+Peak memory per request of the pipeline, with offline stand-ins for the
+OpenAI, Tavily and Mongo clients (no network or API keys needed).
+
+    cd Backend && python Test/bench_memory.py --requests 20 --concurrency 8 --page-kb 200
+    cd Backend && python Test/bench_memory.py --baseline   # keep full texts in state (no arena)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUMMARY_CACHE_ENABLED", "false")
+
+from langgraph_orchestrator import MultiAgentPipeline  # noqa: E402
+
+
+class FakeLLM:
+    def chat(self, messages, priority: int = 1, **kwargs):
+        time.sleep(0.01)
+        if messages[0]["role"] == "system":
+            return {"content": json.dumps({"mode": "competitor", "normalized_query": messages[-1]["content"]})}
+        return {"content": "Summary of the relevant content."}
+
+
+class FakeTavily:
+    def __init__(self, page_kb: int):
+        self.page_kb = page_kb
+
+    def _page(self, url: str) -> str:
+        line = f"Competitor news from {url}: product launch, pricing update and partnership.\n"
+        return line * (self.page_kb * 1024 // len(line))
+
+    def search(self, query, topic, **kwargs):
+        return {"results": [{"url": f"https://site{i}.example/{topic}/{abs(hash(query)) % 1000}", "score": 0.9 - i * 0.05}
+                            for i in range(5)]}
+
+    def extract(self, urls, **kwargs):
+        return {"results": [{"url": u, "raw_content": self._page(u)} for u in urls]}
+
+    def crawl(self, url, **kwargs):
+        return {"results": [{"url": f"{url}/p{i}", "raw_content": self._page(url)} for i in range(3)]}
+
+
+class FakeCollection:
+    class _Result:
+        inserted_id = None
+
+    def insert_one(self, doc):
+        return self._Result()
+
+    def update_one(self, *args, **kwargs):
+        return None
+
+    def replace_one(self, *args, **kwargs):
+        return None
+
+    def create_index(self, *args, **kwargs):
+        return None
+
+    def find(self, *args, **kwargs):
+        return []
+
+
+class FakeDB:
+    def __getitem__(self, name):
+        return FakeCollection()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--page-kb", type=int, default=200)
+    parser.add_argument("--baseline", action="store_true", help="keep full document dicts in the state")
+    args = parser.parse_args()
+
+    pipeline = MultiAgentPipeline(FakeLLM(), FakeTavily(args.page_kb), FakeDB())
+    if args.baseline:
+        pipeline._store_docs = lambda state, docs: list(docs)
+
+    queries = [f"Latest product launches of competitor {i}" for i in range(args.requests)]
+
+    # Sequential pass: exact peak per request
+    tracemalloc.start()
+    peaks = []
+    for query in queries:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        pipeline.run_pipeline(query)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+
+    # Concurrent pass: process peak with overlapping requests
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(pipeline.run_pipeline, queries))
+    elapsed = time.perf_counter() - start
+    _, concurrent_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    peaks.sort()
+    mode = "baseline" if args.baseline else "arena"
+    print(f"mode={mode} page_kb={args.page_kb} requests={args.requests}")
+    print(f"per-request peak: p50={peaks[len(peaks) // 2] / 1e6:.2f} MB max={peaks[-1] / 1e6:.2f} MB")
+    print(f"concurrency={args.concurrency} process peak={(concurrent_peak - before) / 1e6:.2f} MB in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
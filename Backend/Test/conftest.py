@@ -0,0 +1,9 @@
+# Test/conftest.py
+import os
+import sys
+
+# Tests import the backend modules the way the app does (run from Backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Manual scripts that need live Mongo / Tavily credentials
+collect_ignore = ["test_mongo.py", "tavily_test.py"]
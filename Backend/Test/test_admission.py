@@ -0,0 +1,118 @@
+# Test/test_admission.py
+"""Admission gate ordering, timeout and queue limits."""
+import time
+import asyncio
+import threading
+
+import pytest
+
+from admission import AdmissionRejected, AsyncPriorityGate, PriorityGate, UpstreamLimiter
+
+
+def test_async_gate_serves_waiters_by_priority_then_arrival():
+    async def scenario():
+        gate = AsyncPriorityGate(1)
+        assert await gate.acquire()
+        order = []
+
+        async def waiter(name, priority):
+            await gate.acquire(priority)
+            order.append(name)
+            gate.release()
+
+        tasks = []
+        for name, priority in [("low-1", 2), ("high", 0), ("low-2", 2), ("normal", 1)]:
+            tasks.append(asyncio.ensure_future(waiter(name, priority)))
+            await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*tasks)
+        return order, gate.snapshot()
+
+    order, snapshot = asyncio.run(scenario())
+    assert order == ["high", "normal", "low-1", "low-2"]
+    assert snapshot == {"in_use": 0, "capacity": 1, "queued": 0}
+
+
+def test_async_gate_times_out_and_leaves_the_queue():
+    async def scenario():
+        gate = AsyncPriorityGate(1)
+        await gate.acquire()
+        started = time.monotonic()
+        admitted = await gate.acquire(timeout=0.05)
+        return admitted, time.monotonic() - started, gate.snapshot()
+
+    admitted, waited, snapshot = asyncio.run(scenario())
+    assert admitted is False
+    assert waited < 1.0
+    assert snapshot["queued"] == 0 and snapshot["in_use"] == 1
+
+
+def test_async_gate_rejects_with_429_when_queue_is_full():
+    async def scenario():
+        gate = AsyncPriorityGate(1, max_queue=1)
+        await gate.acquire()
+        queued = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await gate.acquire()
+        gate.release()
+        assert await queued
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+
+
+def test_async_gate_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        gate = AsyncPriorityGate(1)
+        await gate.acquire()
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        gate.release()
+        return gate.snapshot()
+
+    assert asyncio.run(scenario()) == {"in_use": 0, "capacity": 1, "queued": 0}
+
+
+def test_threaded_gate_serves_waiters_by_priority():
+    gate = PriorityGate(1)
+    assert gate.acquire()
+    order = []
+
+    def waiter(name, priority):
+        gate.acquire(priority)
+        order.append(name)
+        gate.release()
+
+    threads = []
+    for name, priority in [("low", 2), ("high", 0), ("normal", 1)]:
+        thread = threading.Thread(target=waiter, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        while gate.snapshot()["queued"] < len(threads):
+            time.sleep(0.001)
+    gate.release()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert order == ["high", "normal", "low"]
+
+
+def test_upstream_limiter_rejects_when_saturated():
+    limiter = UpstreamLimiter("test", max_concurrency=1, max_wait=0.05)
+    with limiter.limit():
+        with pytest.raises(AdmissionRejected) as rejected:
+            with limiter.limit():
+                pass
+    assert rejected.value.status_code == 503
+
+
+def test_upstream_limiter_caller_deadline_is_a_timeout_not_a_rejection():
+    limiter = UpstreamLimiter("test", max_concurrency=1, max_wait=5.0)
+    with limiter.limit():
+        with pytest.raises(TimeoutError):
+            with limiter.limit(max_wait=0.05):
+                pass
+    assert limiter.gate.snapshot() == {"in_use": 0, "capacity": 1, "queued": 0}
@@ -0,0 +1,90 @@
+# Test/test_content_cleaner.py
+"""Boilerplate stripping: which blocks are kept and which are dropped."""
+from agents.content_cleaner_agent import ContentCleanerAgent
+from content_arena import ContentArena
+
+PROSE = ("Acme announced a new enterprise pricing tier on Tuesday, aimed at teams with more than "
+         "five hundred seats. The company expects the change to lift average contract value.")
+MORE_PROSE = ("Analysts said the move puts Acme in direct competition with Globex, which cut its own "
+              "prices earlier this year after losing several large accounts.")
+
+
+def clean_one(text, url="https://acme.com/news/1", **kwargs):
+    texts, stats = ContentCleanerAgent(min_output_chars=0, **kwargs).clean([{"url": url, "text": text}])
+    return texts[0], stats
+
+
+def page(*blocks):
+    return "\n\n".join(blocks)
+
+
+def test_prose_and_headings_with_content_are_kept():
+    out, stats = clean_one(page("# Pricing update", PROSE, MORE_PROSE))
+    assert out == page("# Pricing update", PROSE, MORE_PROSE)
+    assert stats["blocks_dropped"] == 0
+
+
+def test_navigation_and_notices_are_dropped():
+    menu = "[Home](https://acme.com) | [Products](https://acme.com/p) | [About](https://acme.com/a)"
+    sparse = "Products\nSolutions\nPricing\nCareers"
+    cookie = "We use cookies to improve your experience. Accept all"
+    out, stats = clean_one(page(menu, PROSE, sparse, cookie, "© 2024 Acme Inc. All rights reserved."))
+    assert out == PROSE
+    assert stats["blocks_dropped"] == 4
+
+
+def test_tables_and_fact_lists_with_figures_are_kept():
+    table = "| Company | Revenue |\n|---|---|\n| Acme | $4.2B |\n| Globex | $3.1B |"
+    facts = "- Revenue: $4.2B\n- Employees: 12,000\n- Founded: 1999"
+    words = "- Products\n- Solutions\n- Careers"
+    out, _ = clean_one(page(PROSE, table, facts, words))
+    assert "| Acme | $4.2B |" in out
+    assert "- Employees: 12,000" in out
+    assert "Solutions" not in out
+
+
+def test_blocks_repeated_across_a_domain_are_dropped():
+    cleaner = ContentCleanerAgent(min_output_chars=0)
+    footer = "Acme Corp is a leading provider of widgets for industrial customers worldwide."
+    texts, _ = cleaner.clean([
+        {"url": "https://acme.com/news/1", "text": page(PROSE, footer)},
+        {"url": "https://www.acme.com/news/2", "text": page(MORE_PROSE, footer)},
+        {"url": "https://globex.com/news/1", "text": page(MORE_PROSE, footer)},
+    ])
+    assert texts[0] == PROSE
+    assert texts[1] == MORE_PROSE
+    assert footer in texts[2]  # another domain
+
+    # Remembered across calls
+    update = "Acme confirmed on Friday that the new tier will be available in Europe from next quarter."
+    later, _ = cleaner.clean([{"url": "https://acme.com/news/3", "text": page(update, footer)}])
+    assert later == [update]
+
+
+def test_over_cleaned_page_keeps_everything_but_images_and_link_targets():
+    text = "# Acme\n\n![logo](https://acme.com/logo.png)\n\n[Contact us](https://acme.com/c)"
+    texts, _ = ContentCleanerAgent().clean([{"url": "https://acme.com/x", "text": text}])
+    assert texts == ["# Acme\n\nContact us"]
+
+
+def test_input_prefix_and_output_are_capped():
+    long_page = page(*[PROSE] * 200)
+    out, stats = clean_one(long_page, max_prompt_chars=1000, max_input_chars=3000)
+    assert len(out) == 1000
+    assert stats["chars_in"] == 3000
+
+
+def test_arena_keeps_only_the_cleaned_text():
+    arena = ContentArena()
+    handles = arena.add_all([
+        {"url": "https://acme.com/1", "text": page("Home\nMenu", PROSE)},
+        {"url": "https://globex.com/2", "text": page(MORE_PROSE, "Subscribe to our newsletter")},
+    ])
+    fetched = [h.get("content_hash") for h in handles]
+    texts, _ = ContentCleanerAgent(min_output_chars=0).clean(handles)
+    arena.rewrite(handles, texts)
+
+    assert [h.get("text") for h in handles] == [PROSE, MORE_PROSE]
+    assert arena.nbytes == len(PROSE) + len(MORE_PROSE)
+    # Summary cache keys keep referring to the page as fetched
+    assert [h.get("content_hash") for h in handles] == fetched
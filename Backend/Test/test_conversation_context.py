@@ -0,0 +1,65 @@
+# Test/test_conversation_context.py
+"""Compact conversation context: entity and time-range extraction, constant prompt size."""
+import json
+
+import pytest
+
+from conversation_context import ConversationContext
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Can you tell me How OpenAI is doing?", ["OpenAI"]),
+    ("Compare Tesla and BYD EV pricing in Europe and Germany", ["Tesla", "BYD"]),
+    ("Any news on Stripe in the United States or New York?", ["Stripe"]),
+    ("Latest Product Launches from Microsoft & Google", ["Microsoft & Google"]),
+    ("Tesla cut prices. Ford followed, and Tesla's margins fell.", ["Tesla"]),
+    ("Ford cut prices. Analysts expect Ford to follow up.", ["Ford"]),
+    ("", []),
+])
+def test_extract_entities(text, expected):
+    assert ConversationContext.extract_entities(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("What did Acme launch in the last 3 months?", "last 3 months"),
+    ("Acme revenue this quarter", "this quarter"),
+    ("Acme results for Q3 FY24", "q3 fy24"),
+    ("Acme acquisitions since March 2023", "since march 2023"),
+    ("Acme growth from 2019 to 2023", "from 2019 to 2023"),
+    ("Acme layoffs 2022-2023", "2022-2023"),
+    ("What is Acme doing with pricing?", None),
+])
+def test_extract_time_range(text, expected):
+    assert ConversationContext.extract_time_range(text) == expected
+
+
+def test_later_time_range_replaces_the_earlier_one():
+    context = ConversationContext()
+    context.update("Acme news this week", "Acme shipped a release.", "news")
+    context.update("And in the last 6 months?", "Acme raised prices twice.", "news")
+    assert context.snapshot()["time_range"] == "last 6 months"
+
+
+def test_off_topic_turns_are_not_tracked():
+    context = ConversationContext()
+    context.update("Hi, I am Sam from Paris", "Hello Sam!", "greeting")
+    context.update("Thanks", "You're welcome.", "greeting")
+    snapshot = context.snapshot()
+    assert snapshot["entities"] == [] and snapshot["summary"] == []
+
+
+def test_messages_stay_the_same_size_however_long_the_conversation():
+    context = ConversationContext(summary_chars=300, max_entities=4, turn_chars=100)
+    assert context.messages() == []
+
+    sizes = []
+    for turn in range(200):
+        context.update(f"What is Company{turn} doing with pricing this quarter?",
+                       f"Company{turn} raised prices for Rival{turn} customers. " * 5, "competitor")
+        sizes.append(len(json.dumps(context.messages())))
+
+    snapshot = context.snapshot()
+    assert len(snapshot["entities"]) == 4
+    assert sum(len(line) + 1 for line in snapshot["summary"]) <= 300
+    assert max(sizes[10:]) <= max(sizes[:10]) + 20
+    assert max(sizes) < 300 + 4 * 60 + 2 * 100 + 300
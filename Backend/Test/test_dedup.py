@@ -0,0 +1,70 @@
+# Test/test_dedup.py
+"""Near-duplicate collapsing around the similarity threshold."""
+from agents.dedup_agent import DedupAgent
+
+BASE = [f"word{i}" for i in range(400)]
+
+
+def doc(url, words):
+    return {"url": url, "text": " ".join(words)}
+
+
+def syndicated_copy():
+    # A reprint with a couple of edits (estimated Jaccard ~0.95)
+    words = list(BASE)
+    words[100] = "edited"
+    words[300] = "changed"
+    return words
+
+
+def partial_overlap():
+    # Shares the first three quarters of the article (Jaccard ~0.6)
+    return BASE[:300] + [f"other{i}" for i in range(100)]
+
+
+def test_syndicated_copy_is_collapsed_into_the_first_doc():
+    docs = [doc("https://a.com/story", BASE), doc("https://b.com/reprint", syndicated_copy())]
+    kept = DedupAgent(threshold=0.8, signature_size=256).dedup(docs)
+    assert [d["url"] for d in kept] == ["https://a.com/story"]
+    assert kept[0]["duplicate_urls"] == ["https://b.com/reprint"]
+
+
+def test_partial_overlap_is_kept_at_the_default_threshold():
+    docs = [doc("https://a.com/story", BASE), doc("https://b.com/followup", partial_overlap())]
+    kept = DedupAgent(threshold=0.8, signature_size=256).dedup(docs)
+    assert [d["url"] for d in kept] == ["https://a.com/story", "https://b.com/followup"]
+    assert not kept[0].get("duplicate_urls")
+
+
+def test_lower_threshold_collapses_partial_overlap():
+    docs = [doc("https://a.com/story", BASE), doc("https://b.com/followup", partial_overlap())]
+    kept = DedupAgent(threshold=0.4, signature_size=256).dedup(docs)
+    assert [d["url"] for d in kept] == ["https://a.com/story"]
+
+
+def test_unrelated_docs_and_order_are_kept():
+    docs = [
+        doc("https://a.com/1", [f"alpha{i}" for i in range(200)]),
+        doc("https://b.com/2", BASE),
+        doc("https://c.com/3", syndicated_copy()),
+        doc("https://d.com/4", [f"beta{i}" for i in range(200)]),
+    ]
+    kept = DedupAgent(signature_size=256).dedup(docs)
+    assert [d["url"] for d in kept] == ["https://a.com/1", "https://b.com/2", "https://d.com/4"]
+    assert kept[1]["duplicate_urls"] == ["https://c.com/3"]
+
+
+def test_short_docs_only_collapse_when_identical():
+    docs = [doc("https://a.com/1", ["acme", "raises"]), doc("https://b.com/2", ["acme", "raises"]),
+            doc("https://c.com/3", ["acme", "falls"])]
+    kept = DedupAgent().dedup(docs)
+    assert [d["url"] for d in kept] == ["https://a.com/1", "https://c.com/3"]
+
+
+def test_large_cluster_of_reprints_collapses_into_one_doc():
+    docs = [doc("https://a.com/story", BASE)] + [
+        doc(f"https://mirror{i}.com/story", syndicated_copy() if i % 2 else BASE) for i in range(200)
+    ]
+    kept = DedupAgent(signature_size=256).dedup(docs)
+    assert [d["url"] for d in kept] == ["https://a.com/story"]
+    assert kept[0]["duplicate_urls"] == [f"https://mirror{i}.com/story" for i in range(200)]
@@ -0,0 +1,104 @@
+# Test/test_local_index.py
+"""BM25 local index: replacing a URL, evicting the oldest documents, persistence."""
+from local_index import LocalIndex
+
+
+def urls(hits):
+    return [h["url"] for h in hits]
+
+
+def assert_same_scores(index, docs, query):
+    """Scores match an index built from just `docs`, so replaced/evicted terms and lengths are gone."""
+    expected = LocalIndex()
+    expected.add_documents(docs)
+    assert [(h["url"], round(h["bm25"], 9)) for h in index.search(query)] == \
+        [(h["url"], round(h["bm25"], 9)) for h in expected.search(query)]
+
+
+def test_search_ranks_by_bm25_and_reports_coverage():
+    index = LocalIndex()
+    index.add_documents([
+        {"url": "https://a.com/1", "text": "Acme launches a new pricing plan for enterprise customers"},
+        {"url": "https://b.com/2", "text": "Globex quarterly results beat expectations"},
+        {"url": "https://c.com/3", "text": "Acme pricing pricing pricing changes"},
+    ])
+    hits = index.search("acme pricing")
+    assert urls(hits) == ["https://c.com/3", "https://a.com/1"]
+    assert hits[0]["score"] == 1.0 and hits[0]["coverage"] == 1.0
+    assert index.search("initech") == []
+
+
+def test_readding_a_url_replaces_its_text():
+    index = LocalIndex()
+    index.add_documents([
+        {"url": "https://a.com/1", "text": "Acme announces layoffs"},
+        {"url": "https://b.com/2", "text": "Globex hires engineers"},
+    ])
+    index.add_documents([{"url": "https://a.com/1", "text": "Acme announces acquisition of Initech"}])
+
+    assert len(index) == 2
+    assert index.search("layoffs") == []
+    assert urls(index.search("acquisition")) == ["https://a.com/1"]
+    assert_same_scores(index, [
+        {"url": "https://b.com/2", "text": "Globex hires engineers"},
+        {"url": "https://a.com/1", "text": "Acme announces acquisition of Initech"},
+    ], "acme globex engineers")
+
+
+def test_oldest_documents_are_evicted_beyond_max_docs():
+    index = LocalIndex(max_docs=2)
+    index.add_documents([{"url": "https://a.com/1", "text": "alpha report"}])
+    index.add_documents([{"url": "https://a.com/2", "text": "beta report"}])
+    # Re-adding makes a document the newest again
+    index.add_documents([{"url": "https://a.com/1", "text": "alpha report updated"}])
+    index.add_documents([{"url": "https://a.com/3", "text": "gamma report"}])
+
+    assert len(index) == 2
+    assert index.search("beta") == []
+    assert sorted(urls(index.search("report"))) == ["https://a.com/1", "https://a.com/3"]
+    assert_same_scores(index, [
+        {"url": "https://a.com/1", "text": "alpha report updated"},
+        {"url": "https://a.com/3", "text": "gamma report"},
+    ], "alpha report")
+
+
+def test_text_is_capped_and_topic_and_age_filters_apply():
+    index = LocalIndex(max_chars=20)
+    index.add_documents([{"url": "https://a.com/1", "text": "acme news " + "filler " * 10 + "hidden", "topic": "news"}],
+                        fetched_at=1.0)
+    index.add_documents([{"url": "https://a.com/2", "text": "acme general", "topic": "general"}])
+
+    assert index.search("hidden") == []
+    assert urls(index.search("acme", topic="news")) == ["https://a.com/1"]
+    assert urls(index.search("acme", max_age=3600)) == ["https://a.com/2"]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "index.json.gz")
+    index = LocalIndex(path=path)
+    index.add_documents([
+        {"url": "https://a.com/1", "text": "Acme pricing update", "title": "Pricing"},
+        {"url": "https://b.com/2", "text": "Globex product launch"},
+    ])
+    index.save()
+
+    restored = LocalIndex(path=path)
+    restored.wait_loaded(timeout=5)
+    assert len(restored) == 2
+    assert urls(restored.search("pricing")) == ["https://a.com/1"]
+
+
+def test_documents_added_before_load_finishes_win(tmp_path):
+    path = str(tmp_path / "index.json.gz")
+    stored = LocalIndex(path=path)
+    stored.add_documents([{"url": "https://a.com/1", "text": "stale version"}])
+    stored.save()
+
+    index = LocalIndex()
+    index.path = path
+    index.add_documents([{"url": "https://a.com/1", "text": "fresh version"}])
+    index.load()
+
+    assert len(index) == 1
+    assert index.search("stale") == []
+    assert urls(index.search("fresh")) == ["https://a.com/1"]
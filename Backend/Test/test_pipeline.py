@@ -0,0 +1,100 @@
+# Test/test_pipeline.py
+"""End-to-end pipeline runs with fake OpenAI, Tavily and Mongo clients."""
+import json
+import time
+
+import pytest
+
+import profiling
+from config import settings
+from admission import AdmissionRejected
+from langgraph_orchestrator import MultiAgentPipeline
+
+PAGE = ("Acme announced a new enterprise pricing tier on Tuesday, aimed at teams with more than "
+        "five hundred seats. The company expects the change to lift average contract value.\n\n")
+
+
+class FakeLLM:
+    def __init__(self, reject_map_calls=False, delay=0.0):
+        self.reject_map_calls = reject_map_calls
+        self.delay = delay
+
+    def chat(self, messages, priority: int = 1, **kwargs):
+        if messages[0]["role"] == "system":
+            return {"content": json.dumps({"mode": "competitor", "normalized_query": "Acme pricing changes"})}
+        if self.reject_map_calls:
+            raise AdmissionRejected("openai is saturated, please retry shortly.")
+        time.sleep(self.delay)
+        return {"content": "Acme launched an enterprise pricing tier."}
+
+
+class FakeTavily:
+    def __init__(self, reject_extract=False, results=3, delay=0.0):
+        self.reject_extract = reject_extract
+        self.results = results
+        self.delay = delay
+
+    def search(self, query, topic, **kwargs):
+        return {"results": [{"url": f"https://site{i}.example/acme", "score": 0.9} for i in range(self.results)]}
+
+    def extract(self, urls, **kwargs):
+        if self.reject_extract:
+            raise AdmissionRejected("tavily_extract is saturated, please retry shortly.")
+        time.sleep(self.delay)
+        return {"results": [{"url": u, "raw_content": PAGE * 3} for u in urls]}
+
+    def crawl(self, url, **kwargs):
+        return {"results": []}
+
+
+class FakeCollection:
+    class _Result:
+        inserted_id = None
+
+    def insert_one(self, doc):
+        return self._Result()
+
+    def update_one(self, *args, **kwargs):
+        return None
+
+
+class FakeDB:
+    def __getitem__(self, name):
+        return FakeCollection()
+
+
+@pytest.fixture(autouse=True)
+def offline_settings(monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LOCAL_INDEX_ENABLED", False)
+
+
+def test_pipeline_answers_from_extracted_pages():
+    pipeline = MultiAgentPipeline(FakeLLM(), FakeTavily(), FakeDB())
+    result = pipeline.run_pipeline("What is Acme doing with pricing?")
+    assert result["status"] == "success"
+    assert "pricing" in json.dumps(result["data"]["content"])
+
+
+def test_openai_rejection_in_the_aggregator_propagates():
+    pipeline = MultiAgentPipeline(FakeLLM(reject_map_calls=True), FakeTavily(), FakeDB())
+    with pytest.raises(AdmissionRejected):
+        pipeline.run_pipeline("What is Acme doing with pricing?")
+
+
+def test_tavily_rejection_in_extract_propagates():
+    pipeline = MultiAgentPipeline(FakeLLM(), FakeTavily(reject_extract=True), FakeDB())
+    with pytest.raises(AdmissionRejected):
+        pipeline.run_pipeline("What is Acme doing with pricing?")
+
+
+def test_profile_samples_the_worker_threads_of_each_node(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_INTERVAL_MS", 2)
+    monkeypatch.setattr(settings, "EXTRACT_BATCH_SIZE", 2)
+    pipeline = MultiAgentPipeline(FakeLLM(delay=0.05), FakeTavily(results=4, delay=0.05), FakeDB())
+    result = pipeline.run_pipeline("What is Acme doing with pricing?", profile=True)
+
+    profile = profiling.store.get(result["profile_id"])
+    roots = {stack[0] for stack in profile.samples}
+    assert {"thread:pipeline", "thread:_extract:worker", "thread:_aggregate:loop", "thread:_aggregate:llm"} <= roots
+    assert {"_extract", "_aggregate"} <= {node["node"] for node in profile.nodes}
@@ -0,0 +1,56 @@
+# Test/test_profiling.py
+"""Request profiles: worker threads are sampled and their CPU counts toward the node."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+from profiling import RequestProfile
+
+
+def busy(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+    return "done"
+
+
+def idle(seconds):
+    time.sleep(seconds)
+
+
+def test_bind_outside_a_profiled_node_returns_the_function():
+    assert profiling.bind(busy) is busy
+    with profiling.node_context(None, "_crawl"):
+        assert profiling.bind(busy) is busy
+
+
+def test_worker_threads_are_sampled_and_charged_to_the_node():
+    profile = RequestProfile("q", interval=0.002)
+    profile.start()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with profiling.node_context(profile, "_crawl"):
+            task = profiling.bind(busy)
+            futures = [executor.submit(task, 0.05) for _ in range(2)]
+            assert [f.result() for f in futures] == ["done", "done"]
+        profile.record_node("_crawl", wall_ms=60.0, cpu_ms=0.0)
+        # Pool threads leave the profile once their task is done
+        executor.submit(idle, 0.03).result()
+    profile.stop()
+
+    node = profile.nodes[0]
+    assert node["node"] == "_crawl" and node["cpu_ms"] >= 90
+    roots = {stack[0] for stack in profile.samples}
+    assert "thread:_crawl:worker" in roots
+    assert not any("idle" in frame for stack in profile.samples for frame in stack)
+
+
+def test_nested_binds_charge_the_outer_node():
+    profile = RequestProfile("q", interval=0.01)
+    with ThreadPoolExecutor(max_workers=1) as outer, ThreadPoolExecutor(max_workers=1) as inner:
+        def aggregate():
+            return inner.submit(profiling.bind(busy, "llm"), 0.03).result()
+
+        with profiling.node_context(profile, "_aggregate"):
+            assert outer.submit(profiling.bind(aggregate, "loop")).result() == "done"
+    profile.record_node("_aggregate", wall_ms=40.0, cpu_ms=0.0)
+    assert profile.nodes[0]["cpu_ms"] >= 25
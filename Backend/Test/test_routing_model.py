@@ -0,0 +1,81 @@
+# Test/test_routing_model.py
+"""Per-domain fetch routing: defaults, skipping dead domains and recovering from it."""
+import routing_model
+from routing_model import RoutingModel
+
+URL = "https://www.dead.com/article"
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def fail_everything(model, url=URL, times=5):
+    for _ in range(times):
+        model.record(url, "extract", False, 0, 1.0)
+        model.record(url, "crawl", False, 0, 3.0)
+
+
+def test_without_history_the_search_score_decides():
+    model = RoutingModel()
+    assert not model.has_history(URL)
+    assert model.choose(URL, 0.9) == "extract"
+    assert model.choose(URL, 0.5) == "crawl"
+
+
+def test_domain_is_skipped_once_both_strategies_keep_yielding_nothing():
+    model = RoutingModel(explore_rate=0.0)
+    fail_everything(model, times=2)
+    assert model.choose(URL, 0.9) == "extract"  # not enough observations yet
+    fail_everything(model, times=3)
+    assert model.choose(URL, 0.9) is None
+    # Keyed by domain, without "www."
+    assert model.choose("https://dead.com/other", 0.5) is None
+    assert model.choose("https://alive.com/page", 0.5) == "crawl"
+
+
+def test_skip_fades_with_time(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(routing_model.time, "time", clock.time)
+    model = RoutingModel(explore_rate=0.0, half_life=1800.0)
+    fail_everything(model)
+    assert model.choose(URL, 0.9) is None
+
+    clock.now += 1800.0
+    assert model.choose(URL, 0.9) == "extract"
+    clock.now += 4 * 3600.0
+    assert not model.has_history(URL)
+
+
+def test_skipped_domain_recovers_after_successes(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(routing_model.time, "time", clock.time)
+    model = RoutingModel(explore_rate=0.0)
+    fail_everything(model)
+    assert model.choose(URL, 0.9) is None
+
+    # An exploratory fetch that works pulls the domain back in
+    for _ in range(3):
+        model.record(URL, "extract", True, 5000, 1.0)
+    assert model.choose(URL, 0.9) == "extract"
+
+
+def test_exploration_fetches_a_share_of_skips(monkeypatch):
+    model = RoutingModel(explore_rate=0.1)
+    fail_everything(model)
+    monkeypatch.setattr(routing_model.random, "random", lambda: 0.05)
+    assert model.choose(URL, 0.5) == "crawl"
+    monkeypatch.setattr(routing_model.random, "random", lambda: 0.5)
+    assert model.choose(URL, 0.5) is None
+
+
+def test_slow_strategy_is_avoided_within_the_latency_budget():
+    model = RoutingModel(latency_budget=5.0)
+    for _ in range(5):
+        model.record("https://slow.com/a", "crawl", True, 8000, 20.0)
+        model.record("https://slow.com/a", "extract", True, 1000, 1.0)
+    assert model.choose("https://slow.com/b", 0.5) == "extract"
@@ -0,0 +1,120 @@
+# Test/test_smart_aggregator.py
+"""Incremental map-reduce: quorum, time budget, hard deadline, late refinement and rejections."""
+import re
+import time
+import threading
+
+import pytest
+
+from admission import AdmissionRejected
+from agents.smart_aggregator_agent import SmartAggregatorAgent
+
+
+class FakeLLM:
+    """
+    Map prompts carry "DOC<n> delay=<seconds> <relevant|irrelevant|reject>"; the
+    reply names the document. Reduce/refine replies list the documents they saw.
+    """
+
+    DOC = re.compile(r"DOC(\d+) delay=([\d.]+) (\w+)")
+
+    def __init__(self):
+        self.map_calls = []
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def chat(self, messages, priority: int = 1, cancelled=None, deadline=None):
+        prompt = messages[-1]["content"]
+        with self._lock:
+            self.prompts.append(prompt)
+        if "Final Answer:" in prompt:
+            kind = "refined" if "Draft Answer" in prompt else "answer"
+            return {"content": f"{kind}: " + " ".join(sorted(set(re.findall(r"summary of DOC\d+", prompt))))}
+        doc, delay, behaviour = self.DOC.search(prompt).groups()
+        if cancelled is not None and cancelled.is_set():
+            # Like LLMClient.chat: an abandoned call gives up before it is sent
+            raise TimeoutError("map call abandoned")
+        with self._lock:
+            self.map_calls.append(int(doc))
+        time.sleep(float(delay))
+        if behaviour == "reject":
+            raise AdmissionRejected("openai is saturated, please retry shortly.")
+        return {"content": f"summary of DOC{doc}" if behaviour == "relevant" else ""}
+
+
+def docs(*specs):
+    return [{"url": f"https://site{i}.example/{i}", "text": f"DOC{i} delay={delay} {behaviour}"}
+            for i, (delay, behaviour) in enumerate(specs)]
+
+
+def run(agent, documents):
+    started = time.perf_counter()
+    result = agent.process_documents("acme pricing", documents, [{"url": d["url"], "topic": "news"} for d in documents])
+    return result["summary"], time.perf_counter() - started
+
+
+def agent(llm, **kwargs):
+    options = {"max_workers": 4, "max_docs_process": 4, "per_doc_timeout": 2.0, "quorum": 2, "time_budget": 1.0}
+    options.update(kwargs)
+    return SmartAggregatorAgent(llm, **options)
+
+
+def test_reduce_starts_once_the_quorum_arrived():
+    llm = FakeLLM()
+    summary, elapsed = run(agent(llm), docs((0.05, "relevant"), (0.05, "relevant"), (1.5, "relevant"), (1.5, "relevant")))
+    assert summary == "answer: summary of DOC0 summary of DOC1"
+    assert elapsed < 0.5
+
+
+def test_budget_expiry_reduces_with_a_single_result():
+    llm = FakeLLM()
+    summary, elapsed = run(agent(llm, quorum=3, time_budget=0.2), docs((0.05, "relevant"), (1.5, "relevant"), (1.5, "relevant")))
+    assert summary == "answer: summary of DOC0"
+    assert 0.2 <= elapsed < 0.6
+
+
+def test_irrelevant_documents_do_not_count_toward_the_quorum():
+    llm = FakeLLM()
+    summary, _ = run(agent(llm, quorum=2), docs((0.05, "irrelevant"), (0.05, "relevant"), (0.1, "relevant")))
+    assert summary == "answer: summary of DOC1 summary of DOC2"
+
+
+def test_nothing_relevant_before_the_hard_deadline():
+    llm = FakeLLM()
+    summary, elapsed = run(agent(llm, per_doc_timeout=0.3, time_budget=0.1),
+                           docs((0.05, "irrelevant"), (1.0, "relevant"), (1.0, "relevant")))
+    assert summary == "No Relevant information found."
+    assert elapsed < 0.8
+    assert not any("Final Answer:" in p for p in llm.prompts)
+
+
+def test_refine_late_folds_in_summaries_that_arrive_after_the_reduce():
+    llm = FakeLLM()
+    summary, _ = run(agent(llm, quorum=1, refine_late=True), docs((0.05, "relevant"), (0.3, "relevant")))
+    assert summary == "refined: summary of DOC0 summary of DOC1"
+
+
+def test_without_refine_late_slow_summaries_are_dropped():
+    llm = FakeLLM()
+    summary, elapsed = run(agent(llm, quorum=1), docs((0.05, "relevant"), (1.0, "relevant")))
+    assert summary == "answer: summary of DOC0"
+    assert elapsed < 0.5
+
+
+def test_abandoned_map_calls_are_not_sent_and_do_not_hold_up_the_run():
+    llm = FakeLLM()
+    # One worker: docs still queued once the quorum arrived are never sent
+    summary, elapsed = run(agent(llm, max_workers=1, quorum=1),
+                           docs((0.05, "relevant"), (0.3, "relevant"), (0.3, "relevant"), (0.3, "relevant")))
+    assert summary == "answer: summary of DOC0"
+    assert elapsed < 0.25
+    time.sleep(0.4)
+    assert llm.map_calls[0] == 0 and len(llm.map_calls) <= 2
+
+
+def test_rejected_map_call_fails_the_run():
+    llm = FakeLLM()
+    started = time.perf_counter()
+    with pytest.raises(AdmissionRejected):
+        run(agent(llm), docs((0.05, "reject"), (1.0, "relevant")))
+    assert time.perf_counter() - started < 0.5
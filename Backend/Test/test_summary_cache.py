@@ -0,0 +1,91 @@
+# Test/test_summary_cache.py
+"""Summary cache: key normalization, irrelevant entries, tier precedence and fetch-time hashes."""
+from summary_cache import SummaryCache
+from agents.smart_aggregator_agent import SmartAggregatorAgent
+
+QUERY = "What are the latest Acme pricing updates?"
+
+
+class FakeLLM:
+    """Map calls answer "fresh summary"; reduce calls list the summaries they were given."""
+
+    def __init__(self):
+        self.map_calls = 0
+
+    def chat(self, messages, priority: int = 1, **kwargs):
+        prompt = messages[-1]["content"]
+        if "Final Answer:" in prompt:
+            return {"content": "answer from: " + ", ".join(s for s in ("fresh summary", "query summary", "generic summary")
+                                                          if s in prompt)}
+        self.map_calls += 1
+        return {"content": "fresh summary"}
+
+
+def doc(text="Acme raised enterprise prices by ten percent.", **extra):
+    return {"url": "https://acme.example/pricing", "text": text, **extra}
+
+
+def run(cache, documents, generic_summaries=False):
+    llm = FakeLLM()
+    agent = SmartAggregatorAgent(llm, quorum=1, time_budget=0.5, summary_cache=cache, generic_summaries=generic_summaries)
+    result = agent.process_documents(QUERY, documents, [{"url": d["url"], "topic": "news"} for d in documents])
+    return result["summary"], llm.map_calls
+
+
+def test_reordered_queries_and_stopwords_share_a_key():
+    cache = SummaryCache()
+    h = cache.content_hash("page")
+    assert cache.normalize_query("What are the latest Acme pricing updates?") == "acme pricing"
+    assert cache.key(h, "Acme pricing") == cache.key(h, "pricing, ACME!") == cache.key(h, QUERY)
+    assert cache.key(h, "Acme hiring") != cache.key(h, "Acme pricing")
+    assert cache.key(h, "Acme pricing") != cache.key(cache.content_hash("other page"), "Acme pricing")
+    assert cache.key(h) != cache.key(h, "")
+
+
+def test_lru_keeps_the_most_recent_entries_until_they_expire():
+    cache = SummaryCache(lru_size=2, ttl_seconds=60)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get_many(["a"])
+    cache.put("c", "C")
+    assert cache.get_many(["a", "b", "c"]) == {"a": "A", "c": "C"}
+
+    expired = SummaryCache(ttl_seconds=0)
+    expired.put("a", "A")
+    assert expired.get_many(["a"]) == {}
+
+
+def test_miss_is_mapped_and_stored_for_the_next_run():
+    cache = SummaryCache()
+    assert run(cache, [doc()]) == ("answer from: fresh summary", 1)
+    assert run(cache, [doc()]) == ("answer from: fresh summary", 0)
+
+
+def test_doc_cached_as_irrelevant_is_dropped_without_a_map_call():
+    cache = SummaryCache()
+    cache.put(cache.key(cache.content_hash(doc()["text"]), QUERY), "")
+    assert run(cache, [doc()]) == ("No Relevant information found.", 0)
+
+
+def test_query_tier_wins_over_the_generic_tier():
+    cache = SummaryCache()
+    h = cache.content_hash(doc()["text"])
+    cache.put(cache.key(h), "generic summary")
+    cache.put(cache.key(h, "acme pricing"), "query summary")
+    assert run(cache, [doc()], generic_summaries=True) == ("answer from: query summary", 0)
+
+
+def test_generic_tier_serves_any_query_and_is_ignored_without_generic_summaries():
+    cache = SummaryCache()
+    cache.put(cache.key(cache.content_hash(doc()["text"])), "generic summary")
+    assert run(cache, [doc()], generic_summaries=True) == ("answer from: generic summary", 0)
+    assert run(cache, [doc()]) == ("answer from: fresh summary", 1)
+
+
+def test_fetch_time_hash_is_preferred_over_the_cleaned_text():
+    cache = SummaryCache()
+    fetched = cache.content_hash("raw page with navigation")
+    cache.put(cache.key(fetched, QUERY), "query summary")
+    # The cleaner may trim the text differently from one run to the next; the key must not change
+    assert run(cache, [doc("cleaned once", content_hash=fetched)]) == ("answer from: query summary", 0)
+    assert run(cache, [doc("cleaned differently", content_hash=fetched)]) == ("answer from: query summary", 0)
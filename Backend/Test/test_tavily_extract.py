@@ -0,0 +1,104 @@
+# Test/test_tavily_extract.py
+"""Batched extraction: batch splitting, single-URL retry, crawl fallback and routing records."""
+import threading
+
+import pytest
+
+from admission import AdmissionRejected
+from agents.tavily_extract_agent import TavilyExtractAgent
+
+PAGE = "Acme announced a new enterprise pricing tier aimed at larger teams. " * 3
+
+
+class FakeTavily:
+    """URLs containing "bad" make the whole call raise; "empty" ones return no content."""
+
+    def __init__(self, reject=False):
+        self.reject = reject
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def extract(self, urls, **kwargs):
+        with self._lock:
+            self.calls.append(list(urls))
+        if self.reject:
+            raise AdmissionRejected("tavily_extract is saturated, please retry shortly.")
+        if any("bad" in url for url in urls):
+            raise RuntimeError("upstream error")
+        return {"results": [{"url": url, "raw_content": "" if "empty" in url else PAGE} for url in urls]}
+
+
+class FakeRoutingModel:
+    def __init__(self):
+        self.records = []
+
+    def record(self, url, strategy, success, useful_chars, latency):
+        self.records.append((url, success))
+
+
+def items(*urls):
+    return [{"url": url, "topic": "news"} for url in urls]
+
+
+def test_urls_are_split_into_batches():
+    client = FakeTavily()
+    results, failed = TavilyExtractAgent(client, batch_size=2).extract(items("a", "b", "c", "d", "e"))
+    assert sorted(map(sorted, client.calls)) == [["a", "b"], ["c", "d"], ["e"]]
+    assert sorted(r["url"] for r in results) == ["a", "b", "c", "d", "e"]
+    assert failed == []
+    assert {r["topic"] for r in results} == {"news"}
+
+
+def test_duplicate_urls_are_extracted_once():
+    client = FakeTavily()
+    results, _ = TavilyExtractAgent(client, batch_size=5).extract(items("a", "a", "b"))
+    assert client.calls == [["a", "b"]]
+    assert len(results) == 2
+
+
+def test_failed_batch_is_retried_url_by_url_and_the_rest_falls_back_to_crawl():
+    client = FakeTavily()
+    results, failed = TavilyExtractAgent(client, batch_size=3).extract(items("a", "bad", "c", "d"))
+    assert sorted(r["url"] for r in results) == ["a", "c", "d"]
+    assert failed == [{"url": "bad", "topic": "news"}]
+    assert sorted(map(sorted, client.calls)) == [["a"], ["a", "bad", "c"], ["bad"], ["c"], ["d"]]
+
+
+def test_pages_without_content_fall_back_to_crawl_without_a_retry():
+    client = FakeTavily()
+    results, failed = TavilyExtractAgent(client, batch_size=5).extract(items("a", "empty"))
+    assert [r["url"] for r in results] == ["a"]
+    assert failed == [{"url": "empty", "topic": "news"}]
+    assert len(client.calls) == 1
+
+
+def test_batch_errors_are_only_recorded_once_the_failing_url_is_known():
+    routing = FakeRoutingModel()
+    agent = TavilyExtractAgent(FakeTavily(), routing_model=routing, batch_size=3)
+    agent.extract(items("a", "bad", "c"))
+    assert sorted(routing.records) == [("a", True), ("bad", False), ("c", True)]
+
+
+def test_without_retries_a_failed_batch_is_not_recorded():
+    routing = FakeRoutingModel()
+    agent = TavilyExtractAgent(FakeTavily(), routing_model=routing, batch_size=3, max_retries=0)
+    _, failed = agent.extract(items("a", "bad", "c"))
+    assert routing.records == []
+    assert [f["url"] for f in failed] == ["a", "bad", "c"]
+
+
+def test_rejection_is_raised_without_retry_fallback_or_record():
+    client, routing = FakeTavily(reject=True), FakeRoutingModel()
+    agent = TavilyExtractAgent(client, routing_model=routing, batch_size=1, max_workers=1)
+    with pytest.raises(AdmissionRejected):
+        agent.extract(items("a", "b", "c"))
+    assert client.calls == [["a"]]
+    assert routing.records == []
+
+
+def test_rejection_in_a_concurrent_batch_is_raised():
+    client, routing = FakeTavily(reject=True), FakeRoutingModel()
+    agent = TavilyExtractAgent(client, routing_model=routing, batch_size=1, max_workers=3)
+    with pytest.raises(AdmissionRejected):
+        agent.extract(items("a", "b", "c", "d"))
+    assert routing.records == []
@@ -0,0 +1,227 @@
+# admission.py
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from typing import Dict
+from contextlib import contextmanager, asynccontextmanager
+from config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request or upstream call can't be admitted in time."""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class PriorityGate:
+    """
+    Counting semaphore whose waiters are served by (priority, arrival order).
+    Lower priority values go first; equal priorities are FIFO.
+    """
+
+    def __init__(self, capacity: int, max_queue: int = None):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.in_use = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority: int = 1, timeout: float = None) -> bool:
+        with self._cond:
+            if self.in_use < self.capacity and not self._waiters:
+                self.in_use += 1
+                return True
+            if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+                raise AdmissionRejected("Too many requests queued, please retry shortly.", status_code=429)
+
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                if self._waiters[0] == entry and self.in_use < self.capacity:
+                    heapq.heappop(self._waiters)
+                    self.in_use += 1
+                    self._cond.notify_all()
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(remaining)
+
+    def release(self):
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            return {"in_use": self.in_use, "capacity": self.capacity, "queued": len(self._waiters)}
+
+
+class AsyncPriorityGate:
+    """
+    PriorityGate for the event loop: waiting requests hold no thread, so the
+    queue can't back up behind the server's threadpool. Single-loop use only.
+    """
+
+    def __init__(self, capacity: int, max_queue: int = None):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.in_use = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int = 1, timeout: float = None) -> bool:
+        if self.in_use < self.capacity and not self._waiters:
+            self.in_use += 1
+            return True
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected("Too many requests queued, please retry shortly.", status_code=429)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if future.done():
+                return True  # granted as the timeout fired
+            self._remove(entry)
+            return False
+        except asyncio.CancelledError:
+            # Client went away: give back a slot granted meanwhile, or leave the queue
+            if future.done():
+                self.release()
+            else:
+                self._remove(entry)
+            raise
+
+    def release(self):
+        self.in_use -= 1
+        while self._waiters and self.in_use < self.capacity:
+            _, _, future = heapq.heappop(self._waiters)
+            self.in_use += 1
+            future.set_result(True)
+
+    def snapshot(self) -> Dict:
+        return {"in_use": self.in_use, "capacity": self.capacity, "queued": len(self._waiters)}
+
+    def _remove(self, entry):
+        self._waiters.remove(entry)
+        heapq.heapify(self._waiters)
+
+
+class TokenBucket:
+    """Rate budget refilled continuously; callers reserve tokens and sleep off any debt."""
+
+    def __init__(self, rate_per_minute: float, burst: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, cost: float, timeout: float) -> bool:
+        cost = min(cost, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (cost - self.tokens) / self.rate if self.tokens < cost else 0.0
+            if wait > timeout:
+                return False
+            self.tokens -= cost
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+class UpstreamLimiter:
+    """Process-wide concurrency and rate budget for one upstream API."""
+
+    def __init__(self, name: str, max_concurrency: int, rate_per_minute: float = 0, max_wait: float = 5.0):
+        self.name = name
+        self.gate = PriorityGate(max_concurrency)
+        self.bucket = TokenBucket(rate_per_minute) if rate_per_minute > 0 else None
+        self.max_wait = max_wait
+
+    @contextmanager
+    def limit(self, cost: float = 1, priority: int = 1, max_wait: float = None):
+        """max_wait: caller's own wait limit, if shorter than the limiter's"""
+        caller_limited = max_wait is not None and max_wait < self.max_wait
+        max_wait = min(max_wait, self.max_wait) if caller_limited else self.max_wait
+        start = time.monotonic()
+        if not self.gate.acquire(priority, timeout=max_wait):
+            if caller_limited:
+                # The caller gave up first; that says nothing about the upstream
+                raise TimeoutError(f"{self.name}: caller deadline passed while queued")
+            raise AdmissionRejected(f"{self.name} is saturated, please retry shortly.")
+        try:
+            remaining = max_wait - (time.monotonic() - start)
+            if self.bucket is not None and not self.bucket.take(cost, max(remaining, 0)):
+                if caller_limited:
+                    raise TimeoutError(f"{self.name}: caller deadline passed while rate limited")
+                raise AdmissionRejected(f"{self.name} rate budget exhausted, please retry shortly.")
+            yield
+        finally:
+            self.gate.release()
+
+
+# ---------------- Process-wide instances ----------------
+request_gate = AsyncPriorityGate(settings.ADMISSION_MAX_CONCURRENT, max_queue=settings.ADMISSION_MAX_QUEUE)
+_pipeline_limiter = None
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def upstream(name: str) -> UpstreamLimiter:
+    """Shared limiter for "openai" (token budget) or a Tavily endpoint (request budget)."""
+    with _upstreams_lock:
+        if name not in _upstreams:
+            if name == "openai":
+                limiter = UpstreamLimiter(name, settings.OPENAI_MAX_CONCURRENCY, settings.OPENAI_TOKENS_PER_MIN, settings.UPSTREAM_MAX_WAIT)
+            else:
+                limiter = UpstreamLimiter(name, settings.TAVILY_MAX_CONCURRENCY, settings.TAVILY_REQUESTS_PER_MIN, settings.UPSTREAM_MAX_WAIT)
+            _upstreams[name] = limiter
+        return _upstreams[name]
+
+
+@asynccontextmanager
+async def admit_request(priority: int = 1):
+    """Hold a request slot for the whole pipeline run, or fail fast with 429/503 (on the event loop)."""
+    if not await request_gate.acquire(priority, timeout=settings.ADMISSION_MAX_WAIT):
+        raise AdmissionRejected("Service is busy, please retry shortly.", status_code=503)
+    try:
+        yield
+    finally:
+        request_gate.release()
+
+
+def pipeline_limiter():
+    """
+    Thread limiter for admitted pipeline runs, sized to the admission capacity,
+    so they never wait on (or starve) the server's default threadpool.
+    """
+    global _pipeline_limiter
+    if _pipeline_limiter is None:
+        import anyio
+        _pipeline_limiter = anyio.CapacityLimiter(settings.ADMISSION_MAX_CONCURRENT)
+    return _pipeline_limiter
+
+
+def snapshot() -> Dict:
+    return {
+        "requests": request_gate.snapshot(),
+        "upstreams": {name: limiter.gate.snapshot() for name, limiter in _upstreams.items()},
+    }
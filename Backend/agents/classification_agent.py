@@ -1,9 +1,10 @@
 # agents/classification_agent.py
 from typing import Dict
-from collections import deque
 from datetime import datetime
 import re
 import json
+from admission import AdmissionRejected
+from conversation_context import ConversationContext
 
 class ClassificationAgent:
     """
@@ -12,14 +13,18 @@ class ClassificationAgent:
         - Classifying mode (competitor, news, blended, greeting, irrelevant)
         - Normalizing/Reconstructing the query itself
         - Greeting detection via simple rules
-        - Maintains last N interactions for context
+        - Keeps a compact conversation context (last turn, rolling summary, tracked entities)
     """
     SIMPLE_GREETINGS = re.compile(r"^(hi|hello|hey|good morning|good afternoon|good evening|greetings)\b", re.I)
 
-    def __init__(self, llm_client, mongo_db, history_size: int = 4):
+    def __init__(self, llm_client, mongo_db, summary_chars: int = 600, max_entities: int = 8):
+        """
+        summary_chars: size cap of the rolling summary of earlier turns
+        max_entities: competitors tracked across turns
+        """
         self.llm = llm_client
         self.collection = mongo_db["query_logs"]
-        self.query_history = deque(maxlen=history_size)
+        self.context = ConversationContext(summary_chars=summary_chars, max_entities=max_entities)
 
     def classify_query(self, user_query: str) -> Dict:
         user_query_clean = user_query.strip()
@@ -29,9 +34,9 @@ class ClassificationAgent:
             normalized = "Hello! I am your Competitive Intelligence Assistant. How can I help you today?"
             mode = "greeting"
             final = True
-            self._log_query(user_query, mode, normalized)
-            self._update_history(user_query, normalized)
-            return {"assistant_message": normalized, "mode": mode, "final": final}
+            log_id = self._log_query(user_query, mode, normalized)
+            self.context.update(user_query, normalized, mode)
+            return {"assistant_message": normalized, "mode": mode, "final": final, "log_id": log_id}
 
         # --- Default fallback ---
         default_mode = "irrelevant"
@@ -45,24 +50,19 @@ class ClassificationAgent:
             "Rewrite query professionally for competitor/news/blended.\n"
             "If greeting, produce friendly professional greeting.\n"
             "If irrelevant, produce short polite response.\n"
-            "Consider last interactions.\n"
+            "Use the conversation context (earlier turns, tracked competitors, time range) and the last turn to resolve follow-up questions.\n"
             "Only handle queries related to business, competitors, or industry news; classify all others (sports, entertainment, politics, general topics) as 'irrelevant' without extra information.\n"
             "Return ONLY valid JSON in this format:\n"
             '{ "mode": "competitor|news|blended|greeting|irrelevant", "normalized_query": "..." }'
         )
 
         try:
-            # Prepare context
-            history_messages = []
-            for h in self.query_history:
-                history_messages.extend([
-                    {"role": "user", "content": h["original_query"]},
-                    {"role": "assistant", "content": h["assistant_message"]}
-                ])
+            # Compact context: constant size however long the conversation is
+            history_messages = self.context.messages()
             history_messages.append({"role": "user", "content": user_query})
 
             # LLM classification call
-            response = self.llm.chat(messages=[{"role": "system", "content": system_prompt}] + history_messages)
+            response = self.llm.chat(messages=[{"role": "system", "content": system_prompt}] + history_messages, priority=0)
             raw_content = response.get("content", "").strip()
 
             # Parse JSON safely
@@ -87,16 +87,19 @@ class ClassificationAgent:
                         "Only competitive intelligence & industry news supported."
                     )
 
+        except AdmissionRejected:
+            # Overload must surface as 429/503, not as an "irrelevant" answer
+            raise
         except Exception:
             mode = "irrelevant"
             normalized = "Only competitive intelligence & industry news supported."
             final = True
 
-        # Log and update history
-        self._log_query(user_query, mode, normalized)
-        self._update_history(user_query, normalized)
+        # Log and update context
+        log_id = self._log_query(user_query, mode, normalized)
+        self.context.update(user_query, normalized, mode)
 
-        return {"assistant_message": normalized, "mode": mode, "final": final}
+        return {"assistant_message": normalized, "mode": mode, "final": final, "log_id": log_id}
 
     # ---------------- Helper Methods ----------------
     def _safe_json_parse(self, text: str) -> Dict:
@@ -117,18 +120,14 @@ class ClassificationAgent:
         return None
 
     def _log_query(self, user_query: str, mode: str, normalized: str):
+        """Log the classified query and return the log id (None if logging failed)."""
         try:
-            self.collection.insert_one({
+            return self.collection.insert_one({
                 "original_query": user_query,
                 "mode": mode,
                 "normalized_query": normalized,
                 "timestamp": datetime.utcnow()
-            })
+            }).inserted_id
         except Exception as e:
             print("Mongo logging failed in ClassificationAgent:", e)
-
-    def _update_history(self, user_query: str, normalized: str):
-        self.query_history.append({
-            "original_query": user_query,
-            "assistant_message": normalized
-        })
+            return None
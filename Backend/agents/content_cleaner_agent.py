@@ -0,0 +1,190 @@
+# agents/content_cleaner_agent.py
+import re
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+class ContentCleanerAgent:
+    """
+    Strips boilerplate from extracted/crawled markdown before it reaches the LLM.
+
+    Pages are split into blank-line separated blocks. A block is dropped when
+    it is mostly link text (menus, link lists), too sparse to be prose
+    (one- or two-word lines, unless it is a table or list with figures),
+    a short cookie/footer notice, or a block that also appears on another
+    page of the same domain. Pages seen earlier count toward that, through
+    a small per-domain memory of block hashes. Image
+    markup is removed and links are reduced to their text in what is kept.
+    Only a bounded prefix of each page is read, and the output is capped at
+    what the aggregator's prompt can use.
+    """
+
+    BOILERPLATE = re.compile(
+        r"\b(cookies?|privacy policy|terms of (use|service)|all rights reserved|subscribe|newsletter|"
+        r"sign (in|up)|log ?in|skip to (main )?content|accept all|follow us|share (this|on))\b|©",
+        re.IGNORECASE,
+    )
+    _BLOCK_SPLIT = re.compile(r"\n\s*\n")
+    _IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+    _LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+    _BARE_URL = re.compile(r"https?://\S+")
+    _MARKUP = re.compile(r"[#*_>`|~\-=]+")
+    _SPACES = re.compile(r"[ \t]+")
+    _WORD = re.compile(r"\w+")
+    _SENTENCE = re.compile(r"[.!?:]\s|[.!?]$")
+    _ROW = re.compile(r"\s*(\||[-*+]\s|\d+[.)]\s)")
+    _DIGIT = re.compile(r"\d")
+
+    def __init__(self, max_link_density: float = 0.5, min_words_per_line: float = 4.0,
+                 max_notice_chars: int = 300, max_repeated_chars: int = 600,
+                 min_output_chars: int = 100, max_domains: int = 500, max_blocks_per_domain: int = 2000,
+                 max_prompt_chars: int = 20000, max_input_chars: int = 60000):
+        """
+        max_link_density: share of a block's text inside links above which it is dropped
+        min_words_per_line: prose density under which a block without sentences is dropped
+        max_notice_chars: blocks up to this size that match BOILERPLATE are dropped
+        max_repeated_chars: blocks repeated across a domain's pages are dropped up to this size
+        min_output_chars: if cleaning leaves less than this, only the markup is stripped
+        max_domains / max_blocks_per_domain: bounds of the repeated-block memory
+        max_prompt_chars: per-document prompt cap of the aggregator; cleaned text is cut there
+        max_input_chars: prefix of each page that is cleaned (arena handles decode only this much)
+        """
+        self.max_link_density = max_link_density
+        self.min_words_per_line = min_words_per_line
+        self.max_notice_chars = max_notice_chars
+        self.max_repeated_chars = max_repeated_chars
+        self.min_output_chars = min_output_chars
+        self.max_domains = max_domains
+        self.max_blocks_per_domain = max_blocks_per_domain
+        self.max_prompt_chars = max_prompt_chars
+        self.max_input_chars = max(max_input_chars, max_prompt_chars)
+        self._seen = OrderedDict()  # domain -> OrderedDict(block hash -> first two urls seen on)
+        self._lock = threading.Lock()
+
+    def clean(self, docs: List[Dict]) -> Tuple[List[str], Dict]:
+        """
+        Return the cleaned text of each doc (in order) and
+        {"docs", "chars_in", "chars_out", "prompt_chars_in", "prompt_chars_out", "blocks_in", "blocks_dropped"},
+        where chars_in counts the prefix read and prompt_chars_* only what fits in the aggregator's cap.
+        """
+        pages = []
+        for doc in docs:
+            text = self._doc_text(doc)
+            blocks = [b.strip() for b in self._BLOCK_SPLIT.split(text)]
+            pages.append((doc, text, [(b, self._block_hash(b)) for b in blocks if b]))
+
+        # Record every page first, so repeats within this batch are caught too
+        repeated = self._observe(pages)
+
+        cleaned = []
+        stats = {"docs": len(docs), "chars_in": 0, "chars_out": 0, "prompt_chars_in": 0, "prompt_chars_out": 0,
+                 "blocks_in": 0, "blocks_dropped": 0}
+        for (doc, text, blocks), repeated_hashes in zip(pages, repeated):
+            kept = [self._strip_markup(b) for b, h in blocks if not self._is_boilerplate(b, h in repeated_hashes)]
+            kept = self._drop_orphan_headings([b for b in kept if b])
+            out = "\n\n".join(kept)
+            if len(out) < self.min_output_chars:
+                # Over-cleaned (or tiny page): keep everything but the markup
+                kept = list(filter(None, (self._strip_markup(b) for b, _ in blocks)))
+                out = "\n\n".join(kept)
+            out = out[:self.max_prompt_chars]
+            stats["chars_in"] += len(text)
+            stats["chars_out"] += len(out)
+            stats["prompt_chars_in"] += min(len(text), self.max_prompt_chars)
+            stats["prompt_chars_out"] += min(len(out), self.max_prompt_chars)
+            stats["blocks_in"] += len(blocks)
+            stats["blocks_dropped"] += len(blocks) - len(kept)
+            cleaned.append(out)
+
+        print(f"[CLEAN] {stats['chars_in']} -> {stats['chars_out']} chars "
+              f"(prompt {stats['prompt_chars_in']} -> {stats['prompt_chars_out']}), "
+              f"{stats['blocks_dropped']}/{stats['blocks_in']} blocks dropped from {stats['docs']} docs")
+        return cleaned, stats
+
+    # ---------------- Helper Methods ----------------
+    def _is_boilerplate(self, block: str, repeated: bool) -> bool:
+        visible = self._IMAGE.sub("", block)
+        if not visible.strip():
+            return True
+        link_chars = sum(len(m.group(1)) for m in self._LINK.finditer(visible))
+        link_chars += sum(len(m.group(0)) for m in self._BARE_URL.finditer(visible))
+        text = self._LINK.sub(r"\1", visible)
+        text_chars = max(len(text.strip()), 1)
+        if link_chars / text_chars > self.max_link_density:
+            return True
+        if repeated and len(text) <= self.max_repeated_chars:
+            return True
+        if len(text) <= self.max_notice_chars and self.BOILERPLATE.search(text):
+            return True
+        if block.lstrip().startswith("#"):
+            return False
+        lines = [line for line in text.splitlines() if line.strip()]
+        if all(self._ROW.match(line) for line in lines) and self._DIGIT.search(text):
+            # Tables and short fact lists ("- Revenue: $4.2B") are terse but carry the figures
+            return False
+        words = len(self._WORD.findall(text))
+        return not self._SENTENCE.search(text) and words / max(len(lines), 1) < self.min_words_per_line
+
+    def _observe(self, pages) -> List[set]:
+        """Remember each page's block hashes per domain; return the hashes also seen on another page."""
+        repeated = []
+        with self._lock:
+            for doc, _, blocks in pages:
+                url = doc.get("url") or ""
+                domain = self._domain(url)
+                seen = self._seen.get(domain)
+                if seen is None:
+                    seen = self._seen[domain] = OrderedDict()
+                    while len(self._seen) > self.max_domains:
+                        self._seen.popitem(last=False)
+                else:
+                    self._seen.move_to_end(domain)
+                for _, h in blocks:
+                    urls = seen.get(h)
+                    if urls is None:
+                        seen[h] = (url,)
+                    else:
+                        if len(urls) < 2 and url not in urls:
+                            seen[h] = urls + (url,)
+                        seen.move_to_end(h)
+                while len(seen) > self.max_blocks_per_domain:
+                    seen.popitem(last=False)
+            # Second pass, once the whole batch is recorded
+            for doc, _, blocks in pages:
+                url = doc.get("url") or ""
+                seen = self._seen.get(self._domain(url), {})
+                repeated.append({h for _, h in blocks if any(u != url for u in seen.get(h, ()))})
+        return repeated
+
+    def _drop_orphan_headings(self, blocks: List[str]) -> List[str]:
+        """Headings whose section was dropped are noise."""
+        kept = []
+        for i, block in enumerate(blocks):
+            if block.startswith("#") and (i + 1 == len(blocks) or blocks[i + 1].startswith("#")):
+                continue
+            kept.append(block)
+        return kept
+
+    def _strip_markup(self, block: str) -> str:
+        block = self._IMAGE.sub("", block)
+        block = self._LINK.sub(r"\1", block)
+        lines = (self._SPACES.sub(" ", line).strip() for line in block.splitlines())
+        return "\n".join(line for line in lines if line and self._MARKUP.sub("", line).strip())
+
+    def _block_hash(self, block: str) -> str:
+        normalized = " ".join(self._WORD.findall(self._LINK.sub(r"\1", block).lower()))
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        netloc = urlparse(url).netloc.lower()
+        return netloc[4:] if netloc.startswith("www.") else netloc
+
+    def _doc_text(self, doc) -> str:
+        """Bounded page prefix; arena-backed handles decode only that much."""
+        if hasattr(doc, "materialize"):
+            return doc.materialize(self.max_input_chars)
+        return (doc.get("text") or "")[:self.max_input_chars]
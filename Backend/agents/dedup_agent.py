@@ -0,0 +1,118 @@
+# agents/dedup_agent.py
+import re
+import time
+import heapq
+from typing import List, Dict
+
+
+class DedupAgent:
+    """
+    Collapses near-duplicate documents before aggregation.
+
+    Each document gets a bottom-k MinHash signature over word shingles of its
+    normalized text. Documents whose estimated Jaccard similarity reaches the
+    threshold are collapsed into the first (highest ranked) copy, and the URLs
+    of the dropped copies are kept on it as extra citations. Documents are
+    matched against cluster representatives only, found through the
+    signature values they share, which keeps large clusters cheap.
+    """
+
+    _WORD = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, threshold: float = 0.8, shingle_size: int = 5, signature_size: int = 64, max_chars: int = 8000):
+        """
+        threshold: estimated Jaccard similarity at which two docs are duplicates
+        shingle_size: number of words per shingle
+        signature_size: number of minimum hashes kept per document
+        max_chars: only this prefix of each document is signed
+        """
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.signature_size = signature_size
+        self.max_chars = max_chars
+
+    def dedup(self, docs: List[Dict]) -> List[Dict]:
+        """
+        Return docs with near-duplicates removed, keeping input order.
+        Kept docs get a "duplicate_urls" list with the URLs of collapsed copies.
+        """
+        if not docs or len(docs) < 2:
+            return docs
+
+        start = time.perf_counter()
+        # Identical copies (the common syndication case) are signed once
+        signed = {}
+        signatures = []
+        for doc in docs:
+            text = self._doc_text(doc)[:self.max_chars]
+            if text not in signed:
+                signed[text] = self._signature(text)
+            signatures.append(signed[text])
+
+        # Each doc is compared only with the representatives (first, highest ranked
+        # copy) of the clusters found so far that share a signature value with it,
+        # so a cluster of m copies costs O(m) comparisons rather than O(m^2)
+        min_shared = max(1, int(self.threshold * self.signature_size))
+        rep_of = list(range(len(docs)))
+        buckets = {}  # signature value -> representatives holding it
+        for idx, sig in enumerate(signatures):
+            shared = {}
+            for value in sig:
+                for rep in buckets.get(value, ()):
+                    shared[rep] = shared.get(rep, 0) + 1
+            full = len(sig) >= self.signature_size
+            for rep in sorted(shared):
+                # Two full signatures over the threshold share at least min_shared values
+                if full and len(signatures[rep]) >= self.signature_size and shared[rep] < min_shared:
+                    continue
+                if signatures[rep] is sig or self._similarity(signatures[rep], sig) >= self.threshold:
+                    rep_of[idx] = rep
+                    break
+            else:
+                for value in sig:
+                    buckets.setdefault(value, []).append(idx)
+
+        kept, duplicates = [], {}
+        for idx, doc in enumerate(docs):
+            root = rep_of[idx]
+            if root == idx:
+                kept.append(doc)
+            else:
+                url = doc.get("url")
+                if url:
+                    duplicates.setdefault(root, []).append(url)
+
+        for root, urls in duplicates.items():
+            doc = docs[root]
+            existing = list(doc.get("duplicate_urls") or [])
+            doc["duplicate_urls"] = existing + [u for u in urls if u not in existing and u != doc.get("url")]
+
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"[DEDUP] kept {len(kept)} of {len(docs)} docs in {elapsed:.1f} ms")
+        return kept
+
+    # ---------------- Helper Methods ----------------
+    def _doc_text(self, doc) -> str:
+        if hasattr(doc, "materialize"):
+            return doc.materialize(self.max_chars)
+        return doc.get("text", "")
+
+    def _normalize(self, text: str) -> List[str]:
+        return self._WORD.findall((text or "").lower())
+
+    def _signature(self, text: str) -> frozenset:
+        """Bottom-k MinHash: the k smallest shingle hashes of the document."""
+        words = self._normalize(text)
+        if len(words) < self.shingle_size:
+            # Too short to shingle, fall back to a single exact-content hash
+            return frozenset([hash(" ".join(words))]) if words else frozenset()
+        shingles = zip(*(words[i:] for i in range(self.shingle_size)))
+        return frozenset(heapq.nsmallest(self.signature_size, set(map(hash, shingles))))
+
+    def _similarity(self, a: frozenset, b: frozenset) -> float:
+        """Estimate Jaccard similarity of two bottom-k signatures."""
+        if not a or not b:
+            return 0.0
+        union_sketch = heapq.nsmallest(self.signature_size, a | b)
+        both = sum(1 for value in union_sketch if value in a and value in b)
+        return both / len(union_sketch)
@@ -1,6 +1,7 @@
 # agents/formatter_agent.py
 from typing import Dict
 from datetime import datetime
+from admission import AdmissionRejected
 
 class FormatterAgent:
     """
@@ -60,6 +61,8 @@ class FormatterAgent:
                 if llm_text:
                     # Replace blocks with LLM-enhanced single paragraph
                     content_blocks = [{"type": "paragraph", "text": llm_text}]
+            except AdmissionRejected:
+                raise
             except Exception as e:
                 print("LLM formatting step failed:", e)
 
@@ -1,95 +1,260 @@
+import time
 import asyncio
+import threading
 from typing import List, Dict
 from concurrent.futures import ThreadPoolExecutor
+from admission import AdmissionRejected
+import profiling
 
 class SmartAggregatorAgent:
-    def __init__(self, llm_client, max_workers=4, max_docs_process=4, max_input_chars=20000, per_doc_timeout=6):
+    def __init__(self, llm_client, max_workers=4, max_docs_process=4, max_input_chars=20000, per_doc_timeout=6,
+                 quorum=3, time_budget=3.0, refine_late=False, summary_cache=None, generic_summaries=False):
         self.llm = llm_client
         self.max_workers = max_workers
         self.max_docs_process = max_docs_process
         self.max_input_chars = max_input_chars
         self.per_doc_timeout = per_doc_timeout
-        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.quorum = quorum
+        self.time_budget = time_budget
+        self.refine_late = refine_late
+        self.summary_cache = summary_cache
+        self.generic_summaries = generic_summaries
 
     def _trim_for_token_limit(self, text: str):
         return text[:self.max_input_chars] if text else ""
 
-    async def _llm_call_async(self, prompt: str):
+    def _doc_text(self, doc):
+        """Trimmed document text; arena-backed handles decode only the prefix that is used."""
+        if hasattr(doc, "materialize"):
+            return doc.materialize(self.max_input_chars)
+        return self._trim_for_token_limit(doc.get("text", ""))
+
+    async def _llm_call_async(self, prompt: str, executor: ThreadPoolExecutor, cancelled: threading.Event = None,
+                              deadline: float = None):
+        """
+        executor: the run's own pool, so calls it abandons can't delay other requests
+        cancelled / deadline: let an abandoned call give up before it is sent (see LLMClient.chat)
+        """
         loop = asyncio.get_event_loop()
         try:
             reply = await loop.run_in_executor(
-                self.executor,
-                lambda: self.llm.chat([{"role": "user", "content": prompt}])
+                executor,
+                profiling.bind(lambda: self.llm.chat([{"role": "user", "content": prompt}], cancelled=cancelled, deadline=deadline),
+                               "llm")
             )
-            content = reply.get("content", "").strip()
-            return content or None
+            # Empty string means the model answered "not relevant"; None means the call failed
+            return reply.get("content", "").strip()
+        except AdmissionRejected:
+            # OpenAI saturated: fail the request fast with 429/503 instead of "No Relevant information found."
+            raise
         except Exception:
             return None
 
-    async def _extract_relevant_async(self, query: str, doc: Dict, topic: str):
-        raw_content = self._trim_for_token_limit(doc.get("text", "")) or "EMPTY_CONTENT"
-        prompt = (
-            "Analyze ONLY the content below. Do NOT use external knowledge.\n"
-            f"Question: {query}\n\n"
-            f"Content:\n{raw_content}\n\n"
-            "Relevant Summary:\n"
-            "Return ONLY a concise summary if the content is relevant to the question.\n"
-            "If the content is NOT relevant to the question, return exactly an empty string, with no quotes or explanation."
-        )
+    async def _extract_relevant_async(self, query: str, doc: Dict, topic: str, cache_key: str, executor: ThreadPoolExecutor,
+                                      cancelled: threading.Event = None, deadline: float = None):
+        raw_content = self._doc_text(doc) or "EMPTY_CONTENT"
+        if self.generic_summaries:
+            prompt = (
+                "Analyze ONLY the content below. Do NOT use external knowledge.\n"
+                f"Content:\n{raw_content}\n\n"
+                "Summary:\n"
+                "Return ONLY a concise summary of the key business facts "
+                "(companies, products, announcements, dates, figures) in the content."
+            )
+        else:
+            prompt = (
+                "Analyze ONLY the content below. Do NOT use external knowledge.\n"
+                f"Question: {query}\n\n"
+                f"Content:\n{raw_content}\n\n"
+                "Relevant Summary:\n"
+                "Return ONLY a concise summary if the content is relevant to the question.\n"
+                "If the content is NOT relevant to the question, return exactly an empty string, with no quotes or explanation."
+            )
+
+        summary = await self._llm_call_async(prompt, executor, cancelled, deadline)
+        if summary is not None and cache_key and self.summary_cache is not None:
+            self.summary_cache.put(cache_key, summary, doc.get("url", ""))
+        return self._summary_item(doc, topic, summary)
 
-        summary = await self._llm_call_async(prompt)
+    def _summary_item(self, doc: Dict, topic: str, summary):
         return {
             "url": doc.get("url", ""),
             "topic": topic,
             "summary": summary,
             "images": (doc.get("images") or [])[:3],
             "title": doc.get("title", ""),
+            "duplicate_urls": doc.get("duplicate_urls") or [],
         }
 
+    def _citation(self, item: Dict):
+        urls = [item["url"]] + item.get("duplicate_urls", [])
+        return ", ".join(u for u in urls if u)
+
+    def _combine_by_topic(self, results: List[Dict]):
+        topic_map = {}
+        for item in results:
+            topic_map.setdefault(item["topic"], []).append(item)
+
+        combined_text = ""
+        for topic, items in topic_map.items():
+            topic_text = "\n".join(f"- {x['summary']} (URL: {self._citation(x)})" for x in items)
+            if topic_text:
+                combined_text += f"Topic: {topic}\n{topic_text}\n\n"
+        return combined_text
+
+    async def _reduce_async(self, query: str, results: List[Dict], executor: ThreadPoolExecutor):
+        combined_text = self._combine_by_topic(results)
+        if not combined_text.strip():
+            return None
+        final_prompt = (
+            f"You are given extracted summaries strictly from provided documents.\n"
+            f"User Query: {query}\n\n"
+            "Combine ONLY the provided summaries into a single, clear answer.\n"
+            "Ignore summaries that are not relevant to the query.\n"
+            "Do NOT use external knowledge.\n\n"
+            f"{combined_text}\nFinal Answer:"
+        )
+        return await self._llm_call_async(final_prompt, executor)
+
+    async def _refine_async(self, query: str, answer: str, late_results: List[Dict], executor: ThreadPoolExecutor):
+        combined_text = self._combine_by_topic(late_results)
+        refine_prompt = (
+            f"You are given a draft answer and additional summaries strictly from provided documents.\n"
+            f"User Query: {query}\n\n"
+            f"Draft Answer:\n{answer}\n\n"
+            f"Additional Summaries:\n{combined_text}\n"
+            "If the additional summaries add new information, return the draft answer updated with it.\n"
+            "Otherwise return the draft answer unchanged.\n"
+            "Do NOT use external knowledge.\n\nFinal Answer:"
+        )
+        try:
+            return await self._llm_call_async(refine_prompt, executor) or answer
+        except AdmissionRejected:
+            # Refining is optional; the draft is already a complete answer
+            return answer
+
+    async def _lookup_cached_async(self, query: str, docs: List[Dict], url_to_topic: Dict, executor: ThreadPoolExecutor):
+        """
+        Split docs into cached relevant summaries and (doc, cache_key) pairs still to map.
+        Docs cached as irrelevant are dropped without an LLM call. Keys use the
+        hash of the page as fetched when the doc carries one, so they don't
+        change as the cleaner learns a domain's repeated blocks.
+        """
+        if self.summary_cache is None or not docs:
+            return [], [(doc, None) for doc in docs]
+
+        lookups = []
+        for doc in docs:
+            content_hash = doc.get("content_hash") or self.summary_cache.content_hash(self._doc_text(doc))
+            query_key = self.summary_cache.key(content_hash, query)
+            generic_key = self.summary_cache.key(content_hash) if self.generic_summaries else None
+            lookups.append((doc, query_key, generic_key))
+
+        keys = [k for _, query_key, generic_key in lookups for k in (query_key, generic_key) if k]
+        loop = asyncio.get_event_loop()
+        hits = await loop.run_in_executor(executor, profiling.bind(self.summary_cache.get_many, "cache"), keys)
+
+        results, to_map = [], []
+        for doc, query_key, generic_key in lookups:
+            summary = hits.get(query_key, hits.get(generic_key))
+            if summary is None:
+                to_map.append((doc, generic_key or query_key))
+            elif summary:
+                results.append(self._summary_item(doc, url_to_topic.get(doc.get("url", ""), "general"), summary))
+
+        print(f"[CACHE] {len(docs) - len(to_map)} of {len(docs)} summaries served from cache")
+        return results, to_map
+
     async def process_documents_async(self, query: str, docs: List[Dict], url_topic_list: List[Dict]):
+        """
+        Incremental map-reduce: per-doc summaries are consumed as they complete
+        and the reduce starts once `quorum` relevant summaries arrived or the
+        `time_budget` elapsed (with at least one relevant summary). Remaining
+        map calls are cancelled, or, with `refine_late`, used to refine the answer.
+        Summaries found in the summary cache skip the map call entirely.
+
+        LLM calls run on a pool owned by this run. Map calls that are abandoned
+        give up before they are sent; ones already in flight stay bounded by
+        per_doc_timeout and can only hold up this run's own threads.
+        """
         url_to_topic = {item["url"]: item.get("topic", "general") for item in url_topic_list}
         docs_to_process = docs[:self.max_docs_process]
 
         semaphore = asyncio.Semaphore(self.max_workers)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        map_cancelled = threading.Event()
 
-        async def sem_task(doc):
+        async def sem_task(doc, cache_key):
             async with semaphore:
+                deadline = time.monotonic() + self.per_doc_timeout
                 try:
                     return await asyncio.wait_for(
-                        self._extract_relevant_async(query, doc, url_to_topic.get(doc.get("url", ""), "general")),
+                        self._extract_relevant_async(query, doc, url_to_topic.get(doc.get("url", ""), "general"), cache_key,
+                                                     executor, map_cancelled, deadline),
                         timeout=self.per_doc_timeout
                     )
                 except asyncio.TimeoutError:
                     return None
 
-        tasks = [sem_task(doc) for doc in docs_to_process]
-        results = [r for r in await asyncio.gather(*tasks) if r and r.get("summary")]
-        # print("res_agg",results)
-        # Aggregate by topic
-        topic_map = {}
-        for item in results:
-            topic_map.setdefault(item["topic"], []).append(item)
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        hard_deadline = started + self.per_doc_timeout
+        budget_deadline = started + min(self.time_budget, self.per_doc_timeout)
+        quorum = min(self.quorum, len(docs_to_process))
 
-        combined_text = ""
-        for topic, items in topic_map.items():
-            topic_text = "\n".join(f"- {x['summary']} (URL: {x['url']})" for x in items)
-            if topic_text:
-                combined_text += f"Topic: {topic}\n{topic_text}\n\n"
+        tasks = set()
+        try:
+            results, to_map = await self._lookup_cached_async(query, docs_to_process, url_to_topic, executor)
+            tasks = {asyncio.ensure_future(sem_task(doc, cache_key)) for doc, cache_key in to_map}
+            pending = set(tasks)
 
-        if combined_text.strip():
-            # Final aggregation
-            final_prompt = (
-                f"You are given extracted summaries strictly from provided documents.\n"
-                f"User Query: {query}\n\n"
-                "Combine ONLY the provided summaries into a single, clear answer.\n"
-                "Do NOT use external knowledge.\n\n"
-                f"{combined_text}\nFinal Answer:"
-            )
+            while pending and len(results) < quorum:
+                # Before the budget only a quorum ends the wait; after it, any relevant summary does
+                now = loop.time()
+                deadline = budget_deadline if results else hard_deadline
+                if deadline <= now:
+                    break
+                timeout = deadline - now
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    r = task.result()
+                    if r and r.get("summary"):
+                        results.append(r)
 
-            blended_reply = await self._llm_call_async(final_prompt) or "No Relevant information found."
-        else:
-            blended_reply="No Relevant information found."
-        return {"summary": blended_reply.strip()}
+            if pending and not self.refine_late:
+                map_cancelled.set()
+                for task in pending:
+                    task.cancel()
+                pending = set()
+
+            blended_reply = await self._reduce_async(query, results, executor) if results else None
+
+            if pending:
+                # Late summaries keep running during the reduce; wait for the rest within the hard deadline
+                late_results = []
+                timeout = hard_deadline - loop.time()
+                if timeout > 0:
+                    done, pending = await asyncio.wait(pending, timeout=timeout)
+                    # With a draft in hand, a late call rejected by the limiter is just skipped
+                    late_results = [t.result() for t in done if not (blended_reply and t.exception())]
+                    late_results = [r for r in late_results if r and r.get("summary")]
+                map_cancelled.set()
+                for task in pending:
+                    task.cancel()
+                if late_results:
+                    if blended_reply:
+                        blended_reply = await self._refine_async(query, blended_reply, late_results, executor)
+                    else:
+                        blended_reply = await self._reduce_async(query, late_results, executor)
+
+            blended_reply = blended_reply or "No Relevant information found."
+            return {"summary": blended_reply.strip()}
+        finally:
+            # A rejected call aborts the run; don't leave its siblings behind
+            map_cancelled.set()
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
 
     def process_documents(self, query: str, docs: List[Dict], url_topic_list: List[Dict]):
         return asyncio.run(self.process_documents_async(query, docs, url_topic_list))
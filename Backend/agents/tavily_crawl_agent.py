@@ -1,6 +1,9 @@
 # agents/tavily_crawl_agent.py
+import time
 from typing import List, Dict, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from admission import AdmissionRejected
+import profiling
 
 class TavilyCrawlAgent:
     """
@@ -8,15 +11,20 @@ class TavilyCrawlAgent:
     Matches ExtractAgent signature: returns (results, original_input)
     """
 
-    def __init__(self, tavily_client, max_urls: int = 3, max_workers: int = 3):
+    def __init__(self, tavily_client, max_urls: int = 3, max_workers: int = 3, local_index=None, routing_model=None):
         """
         tavily_client: shared TavilyClient instance
         max_urls: limit number of URLs to process for speed
-        max_workers: small thread pool for concurrency
+        max_workers: crawls in flight per call; across requests the tavily_crawl
+                     upstream limiter bounds concurrency and sheds load past its wait
+        local_index: optional LocalIndex that crawled documents are added to
+        routing_model: optional RoutingModel that records per-URL outcomes
         """
         self.client = tavily_client
         self.max_urls = max_urls
         self.max_workers = max_workers
+        self.local_index = local_index
+        self.routing_model = routing_model
 
     def crawl(self, urls_with_topics: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
         """
@@ -32,22 +40,34 @@ class TavilyCrawlAgent:
         results = []
 
         if self.max_workers > 1 and len(subset) > 1:
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # A pool per call: a shared one would queue requests behind each other
+            # without limit, before the upstream limiter could shed any of them
+            executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(subset)))
+            try:
+                crawl_single = profiling.bind(self._crawl_single)
                 future_to_item = {
-                    executor.submit(self._crawl_single, item["url"], item.get("topic", "general")): item
+                    executor.submit(crawl_single, item["url"], item.get("topic", "general")): item
                     for item in subset
                 }
                 for future in as_completed(future_to_item):
                     try:
                         docs = future.result()
                         results.extend(docs)
+                    except AdmissionRejected:
+                        raise
                     except Exception as e:
                         print(f"Error crawling {future_to_item[future]['url']}: {e}")
+            finally:
+                # On rejection, don't wait for the crawls still in flight
+                executor.shutdown(wait=False, cancel_futures=True)
         else:
             for item in subset:
                 docs = self._crawl_single(item["url"], item.get("topic", "general"))
                 results.extend(docs)
 
+        if self.local_index is not None:
+            self.local_index.schedule_add(results)
+
         # print("crawl done")
         return results
 
@@ -55,6 +75,7 @@ class TavilyCrawlAgent:
         """
         Individual crawl with strict limits for speed.
         """
+        start = time.perf_counter()
         try:
             response = self.client.crawl(
                 url=url,      
@@ -76,8 +97,17 @@ class TavilyCrawlAgent:
                     "source": "crawled"
                 })
 
+            self._record(url, docs, time.perf_counter() - start)
             return docs
 
+        except AdmissionRejected:
+            # Our own limiter said no: surface it as 429/503 and don't blame the domain
+            raise
         except Exception as e:
             print(f"Error in _crawl_single for {url}: {e}")
-            return []
\ No newline at end of file
+            self._record(url, [], time.perf_counter() - start)
+            return []
+
+    def _record(self, url: str, docs: List[Dict], latency: float):
+        if self.routing_model is not None:
+            self.routing_model.record(url, "crawl", bool(docs), sum(len(d["text"]) for d in docs), latency)
\ No newline at end of file
@@ -1,36 +1,109 @@
+import time
 from typing import List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tavily import TavilyClient
+from admission import AdmissionRejected
+import profiling
 
 class TavilyExtractAgent:
     """
     Extracts content from URLs using a shared Tavily client.
+
+    URLs are split into batches of at most batch_size and extracted
+    concurrently. A failed batch costs only its own URLs: they are retried
+    one by one, and whatever still fails is handed back to the caller to
+    crawl instead. A call that raised is only held against a URL once it
+    failed on its own. AdmissionRejected (Tavily saturated) is not a URL
+    failure: it is raised straight to the caller, without retry or fallback.
     """
 
-    def __init__(self, tavily_client: TavilyClient):
+    def __init__(self, tavily_client: TavilyClient, local_index=None, routing_model=None,
+                 batch_size: int = 5, max_workers: int = 3, max_retries: int = 1):
         """
         tavily_client: an instance of TavilyClient passed from outside
+        local_index: optional LocalIndex that extracted documents are added to
+        routing_model: optional RoutingModel that records per-URL outcomes
+        batch_size: URLs per extract call
+        max_workers: extract calls in flight per call; across requests the
+                     tavily_extract upstream limiter bounds concurrency and sheds load
+        max_retries: extra single-URL attempts for URLs whose call raised
+            (with 0, a raising batch is not recorded in the routing model)
         """
         self.client = tavily_client
+        self.local_index = local_index
+        self.routing_model = routing_model
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.max_workers = max_workers
 
     def extract(self, urls_with_topics: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
         """
-        Extract content from all URLs at once and return:
+        Extract content from all URLs and return:
             1. List of extracted results
-            2. Original urls_with_topics list (unchanged)
+            2. The urls_with_topics items that yielded nothing (to crawl instead)
 
         urls_with_topics: List of dicts like:
             [{"url": "http://...", "topic": "news"}, {"url": "http://...", "topic": "general"}]
         """
-        # print("Extract started")
-
         if not urls_with_topics:
-            return [], urls_with_topics
+            return [], []
+
+        # url -> topic (first occurrence wins, as with the old scan)
+        topics = {}
+        for item in urls_with_topics:
+            topics.setdefault(item["url"], item.get("topic", "general"))
+        urls = list(topics)
+
+        batches = [urls[i:i + self.batch_size] for i in range(0, len(urls), self.batch_size)]
+        results, errored = self._run_batches(batches, topics)
+
+        # Retry URLs whose call raised on their own, so one bad URL can't sink its batch again
+        for _ in range(self.max_retries):
+            if not errored:
+                break
+            retry_results, errored = self._run_batches([[url] for url in errored], topics)
+            results.extend(retry_results)
+
+        extracted = {r["url"] for r in results}
+        failed = [{"url": url, "topic": topics[url]} for url in urls if url not in extracted]
+        if failed:
+            print(f"[EXTRACT] {len(extracted)}/{len(urls)} URLs extracted, {len(failed)} left for crawl")
 
-        # Gather all URLs in one list
-        urls = [item["url"] for item in urls_with_topics]
-        # print('urls',urls)
+        if self.local_index is not None:
+            self.local_index.schedule_add(results)
+        return results, failed
+
+    def _run_batches(self, batches: List[List[str]], topics: Dict[str, str]) -> Tuple[List[Dict], List[str]]:
+        """Extract batches concurrently; return the results and the URLs of batches that raised."""
+        results, errored = [], []
+        if self.max_workers > 1 and len(batches) > 1:
+            # A pool per call: a shared one would queue requests behind each other
+            # without limit, before the upstream limiter could shed any of them
+            executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches)))
+            try:
+                extract_batch = profiling.bind(self._extract_batch)
+                futures = {executor.submit(extract_batch, batch, topics): batch for batch in batches}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    batch_results, ok = future.result()
+                    results.extend(batch_results)
+                    if not ok:
+                        errored.extend(batch)
+            finally:
+                # On rejection, don't wait for the batches still in flight
+                executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            for batch in batches:
+                batch_results, ok = self._extract_batch(batch, topics)
+                results.extend(batch_results)
+                if not ok:
+                    errored.extend(batch)
+        return results, errored
+
+    def _extract_batch(self, urls: List[str], topics: Dict[str, str]) -> Tuple[List[Dict], bool]:
+        """One extract call; returns (results, False) if the call itself failed."""
+        start = time.perf_counter()
         try:
-            # Call extract once
             response = self.client.extract(
                 urls=urls,
                 include_favicon=False,
@@ -38,35 +111,40 @@ class TavilyExtractAgent:
                 extract_depth="basic",
                 format="markdown"
             )
-            # print('extract_actual_response',response)
-
-            results = []
-            res_list = response.get("results", [])
-
-            # Attach topics by matching URL back to urls_with_topics
-            for res in res_list:
-                url = res.get("url")
-                text = res.get("raw_content")
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            print(f"Error during extraction of {len(urls)} URLs: {e}")
+            if len(urls) == 1:
+                # In a batch the failing URL is unknown; the single-URL retry finds it
+                self._record(urls, [], time.perf_counter() - start)
+            return [], False
 
-                # Skip invalid content
-                if not text or len(text.strip()) <= 50:
-                    continue
+        results = []
+        for res in response.get("results", []):
+            url = res.get("url")
+            text = res.get("raw_content")
 
-                # Find topic for this URL
-                topic = next((x.get("topic", "general") for x in urls_with_topics if x["url"] == url), "general")
+            # Skip invalid content
+            if not text or len(text.strip()) <= 50:
+                continue
 
-                results.append({
-                    "url": url,
-                    "text": text,
-                    "favicon": res.get("favicon", []),
-                    "images": res.get("images", []),
-                    "topic": topic,
-                    "source": "extracted"
-                })
+            results.append({
+                "url": url,
+                "text": text,
+                "favicon": res.get("favicon", []),
+                "images": res.get("images", []),
+                "topic": topics.get(url, "general"),
+                "source": "extracted"
+            })
 
-            # print("Extract done")
-            return results
+        self._record(urls, results, time.perf_counter() - start)
+        return results, True
 
-        except Exception as e:
-            print(f"Error during extraction: {e}")
-            return []
+    def _record(self, urls: List[str], results: List[Dict], latency: float):
+        """Feed per-URL outcomes of one extract call to the routing model."""
+        if self.routing_model is None:
+            return
+        useful = {r["url"]: len(r["text"]) for r in results}
+        for url in urls:
+            self.routing_model.record(url, "extract", url in useful, useful.get(url, 0), latency)
@@ -4,20 +4,62 @@ from tavily import TavilyClient
 class TavilySearchAgent:
     """
     Search agent using a shared Tavily client.
+    Checks the local index of previously fetched documents first and only
+    calls Tavily when local recall or freshness is too low.
     """
 
-    def __init__(self, tavily_client: TavilyClient):
+    def __init__(self, tavily_client: TavilyClient, local_index=None, local_min_hits: int = 2,
+                 local_min_coverage: float = 0.8, local_max_age: Dict = None):
         """
         tavily_client: an instance of TavilyClient passed from outside
+        local_index: optional LocalIndex to answer from before calling Tavily
+        local_min_hits: local documents needed to skip Tavily
+        local_min_coverage: share of query terms a local document must contain to count
+        local_max_age: max document age in seconds per topic, e.g. {"news": 21600}
         """
         self.client = tavily_client
+        self.local_index = local_index
+        self.local_min_hits = local_min_hits
+        self.local_min_coverage = local_min_coverage
+        self.local_max_age = local_max_age or {}
 
     def _run_search(self, query: str, topic: str) -> List[Dict]:
         """
         Helper to run search for a given topic and normalize results.
         Only returns results with score > 0.5
+        Local hits are returned with source "local" and their text in "raw_content".
         """
-        response = self.client.search(
+        local_hits = self._search_local(query, topic)
+        if len(local_hits) >= self.local_min_hits:
+            print(f"[LOCAL INDEX] {len(local_hits)} local hits for topic '{topic}', skipping Tavily")
+            return local_hits
+
+        try:
+            response = self._search_remote(query, topic)
+        except Exception as e:
+            # Upstream down or saturated: serve whatever we have locally
+            if local_hits:
+                print(f"Tavily search failed, serving {len(local_hits)} local hits: {e}")
+                return local_hits
+            raise
+        results = response.get("results", [])
+        return [
+            {**r, "score": r.get("score", 0), "topic": topic}
+            for r in results if r.get("score", 0) > 0.5
+        ]
+
+    def _search_local(self, query: str, topic: str) -> List[Dict]:
+        if self.local_index is None:
+            return []
+        hits = self.local_index.search(query, topic=topic, k=5, max_age=self.local_max_age.get(topic))
+        return [
+            {"url": h["url"], "title": h.get("title", ""), "raw_content": h["text"],
+             "score": h["score"], "topic": topic, "source": "local"}
+            for h in hits if h["coverage"] >= self.local_min_coverage
+        ]
+
+    def _search_remote(self, query: str, topic: str) -> Dict:
+        return self.client.search(
             query=query,
             topic=topic,
             search_depth="basic",
@@ -26,11 +68,6 @@ class TavilySearchAgent:
             max_results=5,
             auto_parameters=False  # Explicitly set to False
         )
-        results = response.get("results", [])
-        return [
-            {**r, "score": r.get("score", 0), "topic": topic}
-            for r in results if r.get("score", 0) > 0.5
-        ]
 
     def search(self, query: str, mode: str) -> List[Dict]:
         """
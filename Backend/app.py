@@ -1,47 +1,32 @@
-import os
-from fastapi import FastAPI, HTTPException
+import time
+_IMPORT_START = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from langgraph_orchestrator import MultiAgentPipeline
-import openai
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo import MongoClient
-from tavily import TavilyClient
+import anyio
 from config import settings  # ✅ Centralized config
+from runtime import resources
+from admission import AdmissionRejected, admit_request, pipeline_limiter, snapshot as admission_snapshot
+from agents.classification_agent import ClassificationAgent
+import profiling
 
-
-# ---- Initialize OpenAI Client ----
-class LLMClient:
-    def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
-        if not openai.api_key:
-            raise ValueError("OPENAI_API_KEY not set in environment")
-
-    def chat(self, messages):
-        response = openai.ChatCompletion.create(
-            model=settings.LLM_MODEL,
-            messages=messages,
-            temperature=settings.LLM_TEMPERATURE,
-            max_tokens=settings.LLM_MAX_TOKENS,
-            timeout=settings.LLM_TIMEOUT
-        )
-        return {"content": response.choices[0].message.content.strip()}
-
-
-# ---- Initialize Tavily Client ----
-class TavilyAPIClient:
-    def __init__(self):
-        if not settings.TAVILY_API_KEY:
-            raise ValueError("TAVILY_API_KEY not set in environment")
-        self.client = TavilyClient(api_key=settings.TAVILY_API_KEY)
+IMPORT_MS = round((time.perf_counter() - _IMPORT_START) * 1000, 1)
 
 
-# ---- MongoDB Client Setup ----
-mongo_client = MongoClient(settings.MONGO_URI)
-mongo_db = mongo_client[settings.MONGODB_NAME]
+# ---- Lifespan: build clients and pipeline on startup ----
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await resources.startup(warmup=settings.STARTUP_WARMUP)
+    print(f"[STARTUP] app imports took {IMPORT_MS:.1f} ms")
+    yield
+    await resources.shutdown()
 
 
 # ---- FastAPI Setup ----
-app = FastAPI(title="Multi-Agent Competitive Intelligence API")
+app = FastAPI(title="Multi-Agent Competitive Intelligence API", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Can be restricted later
@@ -50,13 +35,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
-llm_client = LLMClient()
-tavily_client = TavilyAPIClient()
-
-# Initialize Multi-Agent Pipeline
-pipeline = MultiAgentPipeline(llm_client, tavily_client.client, mongo_db)
-
 
 # ---- API Models & Routes ----
 class QueryRequest(BaseModel):
@@ -73,9 +51,73 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    report = {**resources.report(), "import_ms": IMPORT_MS, "admission": admission_snapshot()}
+    return JSONResponse(report, status_code=200 if resources.ready else 503)
+
+
+@app.get("/stats")
+def stats(hours: int = 24, top: int = 10):
+    from mongo_store import query_stats
+    if resources.mongo_db is None:
+        raise HTTPException(status_code=503, detail="Stats unavailable: MongoDB not initialized")
+    try:
+        return query_stats(resources.mongo_db, hours, top)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Stats unavailable: {e}")
+
+
+def require_debug_token(request: Request):
+    """Profiles contain other users' queries: only callers with PROFILE_DEBUG_TOKEN may read them."""
+    if not profiling.authorized(request.headers.get("x-debug-token")):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/debug/profiles")
+async def list_profiles(request: Request):
+    require_debug_token(request)
+    return {"profiles": profiling.store.list()}
+
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request, format: str = "speedscope"):
+    """format: speedscope (JSON for speedscope.app), collapsed (flamegraph.pl) or summary."""
+    require_debug_token(request)
+    profile = profiling.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    if format == "summary":
+        return profile.summary()
+    return profile.speedscope()
+
+
 @app.post("/query")
-async def handle_query(request: QueryRequest):
-    result = pipeline.run_pipeline(request.query)
+async def handle_query(request: QueryRequest, http_request: Request, response: Response):
+    if not resources.ready:
+        raise HTTPException(status_code=503, detail="Service is starting up, please retry shortly.")
+
+    # Greetings never reach the paid upstreams, so they are admitted first
+    priority = 0 if ClassificationAgent.SIMPLE_GREETINGS.match(request.query.strip()) else 1
+
+    # Opt-in per request (X-Profile: 1 with X-Debug-Token) or sampled at PROFILE_SAMPLE_RATE
+    debug_token = http_request.headers.get("x-debug-token")
+    profile = profiling.should_profile(http_request.headers.get("x-profile"), debug_token)
+
+    try:
+        # Queue on the event loop; only admitted requests take a pipeline thread
+        async with admit_request(priority):
+            result = await anyio.to_thread.run_sync(
+                lambda: resources.pipeline.run_pipeline(request.query, profile=profile),
+                limiter=pipeline_limiter(),
+            )
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    profile_id = result.pop("profile_id", None)
+    if profile_id and profiling.authorized(debug_token):
+        response.headers["X-Profile-Id"] = profile_id
     if result.get("status") == "error":
         raise HTTPException(status_code=400, detail=result.get("message"))
     return result
@@ -0,0 +1,72 @@
+# clients.py
+import time
+import openai
+from tavily import TavilyClient
+from config import settings
+from admission import upstream
+
+
+# ---- Initialize OpenAI Client ----
+class LLMClient:
+    def __init__(self):
+        openai.api_key = settings.OPENAI_API_KEY
+        if not openai.api_key:
+            raise ValueError("OPENAI_API_KEY not set in environment")
+
+    def chat(self, messages, priority: int = 1, cancelled=None, deadline: float = None):
+        """
+        priority: 0 for cheap, latency-critical calls (classification) that jump the queue.
+        cancelled: threading.Event; once set, the call is dropped before it is sent
+        deadline: time.monotonic() by which the caller stops waiting; bounds the
+                  limiter wait and the request timeout
+        """
+        # Rough token estimate: ~4 characters per prompt token plus the completion budget
+        cost = sum(len(m.get("content", "")) for m in messages) // 4 + settings.LLM_MAX_TOKENS
+        timeout = settings.LLM_TIMEOUT
+        max_wait = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if cancelled is not None and cancelled.is_set():
+            raise TimeoutError("LLM call abandoned by the caller")
+        with upstream("openai").limit(cost=cost, priority=priority, max_wait=max_wait):
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+            if (cancelled is not None and cancelled.is_set()) or timeout <= 0:
+                # Nobody is waiting for the answer any more; give the slot back unused
+                raise TimeoutError("LLM call abandoned by the caller")
+            response = openai.ChatCompletion.create(
+                model=settings.LLM_MODEL,
+                messages=messages,
+                temperature=settings.LLM_TEMPERATURE,
+                max_tokens=settings.LLM_MAX_TOKENS,
+                timeout=timeout
+            )
+        return {"content": response.choices[0].message.content.strip()}
+
+
+# ---- Initialize Tavily Client ----
+class TavilyAPIClient:
+    def __init__(self):
+        if not settings.TAVILY_API_KEY:
+            raise ValueError("TAVILY_API_KEY not set in environment")
+        self.client = LimitedTavilyClient(TavilyClient(api_key=settings.TAVILY_API_KEY))
+
+
+class LimitedTavilyClient:
+    """TavilyClient proxy that routes search/extract/crawl through their upstream limiters."""
+
+    def __init__(self, client: TavilyClient):
+        self.client = client
+
+    def search(self, *args, **kwargs):
+        with upstream("tavily_search").limit():
+            return self.client.search(*args, **kwargs)
+
+    def extract(self, *args, **kwargs):
+        with upstream("tavily_extract").limit():
+            return self.client.extract(*args, **kwargs)
+
+    def crawl(self, *args, **kwargs):
+        with upstream("tavily_crawl").limit():
+            return self.client.crawl(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -17,14 +17,74 @@ class Settings:
     LLM_MAX_TOKENS: int = int(os.getenv("LLM_MAX_TOKENS", 400))
     LLM_TIMEOUT: int = int(os.getenv("LLM_TIMEOUT", 5))
 
+    # Classification context settings
+    CONTEXT_SUMMARY_CHARS: int = int(os.getenv("CONTEXT_SUMMARY_CHARS", 600))
+    CONTEXT_MAX_ENTITIES: int = int(os.getenv("CONTEXT_MAX_ENTITIES", 8))
+
     # Crawling settings
     CRAWL_DEPTH: int = int(os.getenv("CRAWL_DEPTH", 1))
     CRAWL_MAX_PAGES: int = int(os.getenv("CRAWL_MAX_PAGES", 5))
     THREADPOOL_WORKERS: int = int(os.getenv("THREADPOOL_WORKERS", 5))
+    FETCH_LATENCY_BUDGET: float = float(os.getenv("FETCH_LATENCY_BUDGET", 8.0))
+    EXTRACT_BATCH_SIZE: int = int(os.getenv("EXTRACT_BATCH_SIZE", 5))
+    EXTRACT_MAX_WORKERS: int = int(os.getenv("EXTRACT_MAX_WORKERS", 3))
+    EXTRACT_RETRIES: int = int(os.getenv("EXTRACT_RETRIES", 1))
+
+    # Aggregation settings
+    AGGREGATOR_QUORUM: int = int(os.getenv("AGGREGATOR_QUORUM", 3))
+    AGGREGATOR_TIME_BUDGET: float = float(os.getenv("AGGREGATOR_TIME_BUDGET", 3.0))
+    AGGREGATOR_REFINE_LATE: bool = os.getenv("AGGREGATOR_REFINE_LATE", "false").lower() == "true"
+
+    # Summary cache settings
+    SUMMARY_CACHE_ENABLED: bool = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+    SUMMARY_CACHE_TTL: int = int(os.getenv("SUMMARY_CACHE_TTL", 21600))
+    SUMMARY_CACHE_LRU_SIZE: int = int(os.getenv("SUMMARY_CACHE_LRU_SIZE", 1024))
+    SUMMARY_CACHE_GENERIC: bool = os.getenv("SUMMARY_CACHE_GENERIC", "false").lower() == "true"
+
+    # Local retrieval tier settings
+    LOCAL_INDEX_ENABLED: bool = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() == "true"
+    LOCAL_INDEX_PATH: str = os.getenv("LOCAL_INDEX_PATH", "local_index.json.gz")
+    LOCAL_INDEX_MAX_DOCS: int = int(os.getenv("LOCAL_INDEX_MAX_DOCS", 2000))
+    LOCAL_MIN_HITS: int = int(os.getenv("LOCAL_MIN_HITS", 2))
+    LOCAL_MIN_COVERAGE: float = float(os.getenv("LOCAL_MIN_COVERAGE", 0.8))
+    LOCAL_MAX_AGE_NEWS_HOURS: float = float(os.getenv("LOCAL_MAX_AGE_NEWS_HOURS", 6))
+    LOCAL_MAX_AGE_GENERAL_HOURS: float = float(os.getenv("LOCAL_MAX_AGE_GENERAL_HOURS", 168))
+
+    # Near-duplicate detection settings
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", 0.8))
+    DEDUP_SHINGLE_SIZE: int = int(os.getenv("DEDUP_SHINGLE_SIZE", 5))
+    DEDUP_SIGNATURE_SIZE: int = int(os.getenv("DEDUP_SIGNATURE_SIZE", 64))
+
+    # Content cleaning settings
+    CLEANING_ENABLED: bool = os.getenv("CLEANING_ENABLED", "true").lower() == "true"
+    CLEANING_MAX_LINK_DENSITY: float = float(os.getenv("CLEANING_MAX_LINK_DENSITY", 0.5))
+
+    # Admission control settings
+    ADMISSION_MAX_CONCURRENT: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", 16))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", 32))
+    ADMISSION_MAX_WAIT: float = float(os.getenv("ADMISSION_MAX_WAIT", 2.0))
+    UPSTREAM_MAX_WAIT: float = float(os.getenv("UPSTREAM_MAX_WAIT", 5.0))
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))
+    OPENAI_TOKENS_PER_MIN: int = int(os.getenv("OPENAI_TOKENS_PER_MIN", 200000))
+    TAVILY_MAX_CONCURRENCY: int = int(os.getenv("TAVILY_MAX_CONCURRENCY", 6))
+    TAVILY_REQUESTS_PER_MIN: int = int(os.getenv("TAVILY_REQUESTS_PER_MIN", 100))
+
+    # Profiling settings
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    PROFILE_HISTORY: int = int(os.getenv("PROFILE_HISTORY", 50))
+    PROFILE_DEBUG_TOKEN: str = os.getenv("PROFILE_DEBUG_TOKEN", "")
+
+    # Startup settings
+    STARTUP_WARMUP: bool = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
 
     # MongoDB settings
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     MONGODB_NAME: str = os.getenv("MONGODB_NAME", "multiagentdb")
+    MONGO_TIMEOUT_MS: int = int(os.getenv("MONGO_TIMEOUT_MS", 3000))
+    MONGO_RETRY_SECONDS: int = int(os.getenv("MONGO_RETRY_SECONDS", 10))
+    LOG_RETENTION_DAYS: int = int(os.getenv("LOG_RETENTION_DAYS", 30))
+    LOG_CAPPED_MB: int = int(os.getenv("LOG_CAPPED_MB", 0))
 
 
 settings = Settings()
@@ -0,0 +1,112 @@
+# content_arena.py
+import hashlib
+from typing import Dict, List
+
+
+class DocHandle:
+    """
+    Compact reference to a document whose text lives in a ContentArena.
+    Supports the dict-style get()/[]= used by the agents, so handles can be
+    passed wherever document dicts were; "text" is materialized on access.
+    """
+
+    __slots__ = ("url", "topic", "title", "source", "images", "content_hash", "offset", "length",
+                 "duplicate_urls", "_arena")
+
+    def __init__(self, arena, url, topic, title, source, images, content_hash, offset, length):
+        self._arena = arena
+        self.url = url
+        self.topic = topic
+        self.title = title
+        self.source = source
+        self.images = images
+        self.content_hash = content_hash
+        self.offset = offset
+        self.length = length
+        self.duplicate_urls = []
+
+    def materialize(self, max_chars: int = None) -> str:
+        """Decode the document text (or only its first max_chars characters)."""
+        return self._arena.text(self, max_chars)
+
+    def get(self, key: str, default=None):
+        if key == "text":
+            return self.materialize()
+        if key in self.__slots__ and not key.startswith("_"):
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__ or key.startswith("_"):
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __repr__(self):
+        return f"DocHandle({self.url!r}, {self.length} bytes)"
+
+
+class ContentArena:
+    """
+    Request-scoped store for document text.
+
+    Text is appended as UTF-8 to one buffer and referenced by byte offsets
+    from DocHandles kept in the pipeline state. release() drops the buffer
+    when the request ends, whatever still holds the handles.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._buffer)
+
+    def add(self, doc: Dict) -> DocHandle:
+        data = (doc.get("text") or "").encode("utf-8", "ignore")
+        handle = DocHandle(
+            self,
+            url=doc.get("url"),
+            topic=doc.get("topic", "general"),
+            title=doc.get("title", ""),
+            source=doc.get("source"),
+            images=(doc.get("images") or [])[:3],
+            content_hash=hashlib.sha1(data).hexdigest(),
+            offset=len(self._buffer),
+            length=len(data),
+        )
+        self._buffer.extend(data)
+        self.count += 1
+        return handle
+
+    def add_all(self, docs: List[Dict]) -> List[DocHandle]:
+        return [self.add(doc) for doc in docs]
+
+    def text(self, handle: DocHandle, max_chars: int = None) -> str:
+        length = handle.length
+        if max_chars is not None:
+            # A character is at most 4 UTF-8 bytes
+            length = min(length, max_chars * 4)
+        with memoryview(self._buffer) as buffer:
+            text = str(buffer[handle.offset:handle.offset + length], "utf-8", "ignore")
+        return text[:max_chars] if max_chars is not None else text
+
+    def rewrite(self, handles: List[DocHandle], texts: List[str]):
+        """
+        Replace the text of handles in a new buffer holding only these texts
+        (e.g. after cleaning), so the old buffer can be freed. Handles that
+        are not passed must not be read afterwards. content_hash keeps
+        identifying the text as fetched.
+        """
+        buffer = bytearray()
+        for handle, text in zip(handles, texts):
+            data = (text or "").encode("utf-8", "ignore")
+            handle.offset = len(buffer)
+            handle.length = len(data)
+            buffer.extend(data)
+        self._buffer = buffer
+        self.count = len(handles)
+
+    def release(self):
+        self._buffer = bytearray()
@@ -0,0 +1,174 @@
+# conversation_context.py
+import re
+import json
+import threading
+from typing import Dict, List, Optional
+
+
+class ConversationContext:
+    """
+    Fixed-size conversation state for the classification prompt.
+
+    Instead of replaying every past turn, it keeps:
+        - the last turn verbatim (truncated)
+        - a rolling summary of earlier turns, one short line each, capped at summary_chars
+        - the competitors/companies and the time range being discussed
+    so the prompt stays the same size however long the conversation gets.
+    """
+
+    TIME_RANGE = re.compile(
+        r"\b(?:(?:(?:from|between)\s+)?(?:19|20)\d{2}\s*(?:-|to|and)\s*(?:19|20)\d{2}"
+        r"|(?:last|past|previous|next|coming)\s+(?:\d+\s+)?(?:days?|weeks?|months?|quarters?|years?)"
+        r"|(?:this|last|next)\s+(?:week|month|quarter|year)"
+        r"|(?:today|yesterday|year[- ]to[- ]date|ytd)"
+        r"|(?:since|in|during|from)\s+(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+)?(?:19|20)\d{2}"
+        r"|q[1-4]\s*(?:fy)?\s*(?:19|20)?\d{2}"
+        r"|h[12]\s+(?:19|20)\d{2})\b",
+        re.IGNORECASE,
+    )
+    ENTITY = re.compile(r"\b[A-Z][\w&.\-]*(?:\s+(?:&\s+)?[A-Z][\w&.\-]*)*")
+    NOT_ENTITIES = frozenset(
+        "a an and the of for in on at to by with from about what which who how why when where is are was "
+        "latest recent current new top key main provide give show list find get tell summarize summarise "
+        "analyze analyse compare comparison overview update updates news report reports trends trend "
+        "market markets industry industries competitor competitors competitive intelligence analysis "
+        "strategy strategies product products pricing price launch launches revenue growth share "
+        "ceo cfo cto ai ml api saas b2b b2c esg ipo m&a q1 q2 q3 q4 h1 h2 fy ytd "
+        "january february march april may june july august september october november december "
+        "monday tuesday wednesday thursday friday saturday sunday "
+        "hello hi hey thanks please only also their its this that these those "
+        "can could would should will shall do does did has have had i you we they he she it my our your "
+        "explain describe ev evs".split()
+    )
+    _SENTENCE_END = re.compile(r"(?:^|[.!?:;\n])[\s\"'(]*$")
+    # Places are context for a question, not companies to track
+    PLACES = frozenset(
+        "europe,asia,africa,america,north america,south america,latin america,middle east,emea,apac,latam,"
+        "eu,uk,u.k,us,u.s,usa,united states,united kingdom,canada,mexico,brazil,"
+        "germany,france,italy,spain,netherlands,sweden,norway,switzerland,poland,ireland,"
+        "china,japan,korea,south korea,india,singapore,australia,israel,russia,turkey,uae,saudi arabia,"
+        "london,paris,berlin,new york,san francisco,silicon valley,california,texas,beijing,shanghai,tokyo".split(",")
+    )
+
+    def __init__(self, summary_chars: int = 600, max_entities: int = 8, turn_chars: int = 300):
+        """
+        summary_chars: size cap of the rolling summary of earlier turns
+        max_entities: tracked competitors kept (most recently mentioned first)
+        turn_chars: size cap of each side of the last turn
+        """
+        self.summary_chars = summary_chars
+        self.max_entities = max_entities
+        self.turn_chars = turn_chars
+        self._summary = []      # one line per earlier turn, oldest first
+        self._entities = []     # most recent first
+        self._time_range = None
+        self._last_turn = None  # (user query, assistant message, mode)
+        self._lock = threading.Lock()
+
+    def update(self, user_query: str, assistant_message: str, mode: str):
+        """Record a finished turn; the previous last turn is folded into the summary."""
+        relevant = mode in ("competitor", "news", "blended")
+        with self._lock:
+            if self._last_turn is not None:
+                self._fold(*self._last_turn)
+            self._last_turn = (self._truncate(user_query), self._truncate(assistant_message), mode)
+            if relevant:
+                text = f"{user_query}\n{assistant_message}"
+                self._track_entities(self.extract_entities(text))
+                time_range = self.extract_time_range(user_query) or self.extract_time_range(assistant_message)
+                if time_range:
+                    self._time_range = time_range
+
+    def messages(self) -> List[Dict]:
+        """Chat messages carrying the compact context and the last turn (empty before the first turn)."""
+        with self._lock:
+            context = {}
+            if self._summary:
+                context["earlier_turns"] = "\n".join(self._summary)
+            if self._entities:
+                context["tracked_competitors"] = list(self._entities)
+            if self._time_range:
+                context["time_range"] = self._time_range
+            last_turn = self._last_turn
+
+        messages = []
+        if context:
+            messages.append({"role": "system", "content": "Conversation context: " + json.dumps(context)})
+        if last_turn is not None:
+            messages.extend([
+                {"role": "user", "content": last_turn[0]},
+                {"role": "assistant", "content": last_turn[1]},
+            ])
+        return messages
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "summary": list(self._summary),
+                "entities": list(self._entities),
+                "time_range": self._time_range,
+                "last_turn": self._last_turn,
+            }
+
+    # ---------------- Extraction ----------------
+    @classmethod
+    def extract_entities(cls, text: str) -> List[str]:
+        """
+        Capitalized names that are not common query words or places, in order
+        of appearance. A capitalized word opening a sentence ("Can you...") is
+        only kept when the text also capitalizes it mid-sentence, or when it
+        has capitals past its first letter ("OpenAI", "BYD").
+        """
+        text = text or ""
+        matches = [(m, cls._SENTENCE_END.search(text[:m.start()]) is not None) for m in cls.ENTITY.finditer(text)]
+        mid_sentence = {w for m, initial in matches for w in m.group(0).split()[initial:]}
+        entities = []
+
+        def add(words):
+            name = " ".join(words).strip(" .&-")
+            if len(name) > 1 and name not in entities and name.lower().strip(".") not in cls.PLACES:
+                entities.append(name)
+
+        for match, initial in matches:
+            words = re.sub(r"'s\b", "", match.group(0)).split()
+            if initial and words[0][1:].islower() and words[0] not in mid_sentence:
+                words = words[1:]
+            if " ".join(words).lower().strip(".") in cls.PLACES:
+                continue
+            # Generic words ("Latest", "News", "And") split a capitalized run into separate names
+            run = []
+            for word in words:
+                if word.lower().strip(".-") in cls.NOT_ENTITIES:
+                    add(run)
+                    run = []
+                else:
+                    run.append(word)
+            add(run)
+        return entities
+
+    @classmethod
+    def extract_time_range(cls, text: str) -> Optional[str]:
+        match = cls.TIME_RANGE.search(text or "")
+        return match.group(0).lower() if match else None
+
+    # ---------------- Helper Methods ----------------
+    def _fold(self, user_query: str, assistant_message: str, mode: str):
+        """Append a turn to the summary as one short line, dropping the oldest lines past the cap."""
+        if mode not in ("competitor", "news", "blended"):
+            # Greetings and off-topic turns carry nothing worth remembering
+            return
+        self._summary.append(f"{mode}: {assistant_message}"[:self.summary_chars // 3])
+        while len(self._summary) > 1 and sum(len(s) + 1 for s in self._summary) > self.summary_chars:
+            self._summary.pop(0)
+
+    def _track_entities(self, entities: List[str]):
+        for name in reversed(entities):
+            name = name[:60]
+            if name in self._entities:
+                self._entities.remove(name)
+            self._entities.insert(0, name)
+        del self._entities[self.max_entities:]
+
+    def _truncate(self, text: str) -> str:
+        text = (text or "").strip()
+        return text if len(text) <= self.turn_chars else text[:self.turn_chars - 3] + "..."
@@ -4,27 +4,88 @@ import asyncio
 from typing import Dict
 from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph
+from config import settings
+from admission import AdmissionRejected
+from summary_cache import SummaryCache
+from content_arena import ContentArena
+from local_index import LocalIndex
+from routing_model import RoutingModel
+import profiling
+from agents.classification_agent import ClassificationAgent
+from agents.tavily_search_agent import TavilySearchAgent
+from agents.tavily_extract_agent import TavilyExtractAgent
+from agents.tavily_crawl_agent import TavilyCrawlAgent
+from agents.content_cleaner_agent import ContentCleanerAgent
+from agents.dedup_agent import DedupAgent
+from agents.smart_aggregator_agent import SmartAggregatorAgent
+from agents.formatter_agent import FormatterAgent
 
 class MultiAgentPipeline:
     def __init__(self, llm_client, tavily_client, mongo_db):
         self.llm_client = llm_client
         self.tavily_client = tavily_client
         self.mongo_db = mongo_db
+        self.log_executor = ThreadPoolExecutor(max_workers=1)
 
-        # Import agents
-        from agents.classification_agent import ClassificationAgent
-        from agents.tavily_search_agent import TavilySearchAgent
-        from agents.tavily_extract_agent import TavilyExtractAgent
-        from agents.tavily_crawl_agent import TavilyCrawlAgent
-        from agents.smart_aggregator_agent import SmartAggregatorAgent
-        from agents.formatter_agent import FormatterAgent
+        # Shared per-document summary cache (Mongo + in-memory LRU)
+        self.summary_cache = SummaryCache(
+            self.mongo_db,
+            ttl_seconds=settings.SUMMARY_CACHE_TTL,
+            lru_size=settings.SUMMARY_CACHE_LRU_SIZE,
+        ) if settings.SUMMARY_CACHE_ENABLED else None
+
+        # Local retrieval tier over everything extracted or crawled so far
+        self.local_index = LocalIndex(
+            settings.LOCAL_INDEX_PATH,
+            max_docs=settings.LOCAL_INDEX_MAX_DOCS,
+        ) if settings.LOCAL_INDEX_ENABLED else None
+
+        # Per-domain extract/crawl yield and latency, used to route each URL
+        self.routing_model = RoutingModel(latency_budget=settings.FETCH_LATENCY_BUDGET)
 
         # Initialize agents
-        self.input_agent = ClassificationAgent(llm_client, self.mongo_db)
-        self.search_agent = TavilySearchAgent(self.tavily_client)
-        self.extract_agent = TavilyExtractAgent(self.tavily_client)
-        self.crawl_agent = TavilyCrawlAgent(self.tavily_client)
-        self.aggregate_agent = SmartAggregatorAgent(llm_client)
+        self.input_agent = ClassificationAgent(
+            llm_client,
+            self.mongo_db,
+            summary_chars=settings.CONTEXT_SUMMARY_CHARS,
+            max_entities=settings.CONTEXT_MAX_ENTITIES,
+        )
+        self.search_agent = TavilySearchAgent(
+            self.tavily_client,
+            local_index=self.local_index,
+            local_min_hits=settings.LOCAL_MIN_HITS,
+            local_min_coverage=settings.LOCAL_MIN_COVERAGE,
+            local_max_age={
+                "news": settings.LOCAL_MAX_AGE_NEWS_HOURS * 3600,
+                "general": settings.LOCAL_MAX_AGE_GENERAL_HOURS * 3600,
+            },
+        )
+        self.extract_agent = TavilyExtractAgent(
+            self.tavily_client,
+            local_index=self.local_index,
+            routing_model=self.routing_model,
+            batch_size=settings.EXTRACT_BATCH_SIZE,
+            max_workers=settings.EXTRACT_MAX_WORKERS,
+            max_retries=settings.EXTRACT_RETRIES,
+        )
+        self.crawl_agent = TavilyCrawlAgent(self.tavily_client, local_index=self.local_index, routing_model=self.routing_model)
+        self.dedup_agent = DedupAgent(
+            threshold=settings.DEDUP_THRESHOLD,
+            shingle_size=settings.DEDUP_SHINGLE_SIZE,
+            signature_size=settings.DEDUP_SIGNATURE_SIZE,
+        )
+        self.aggregate_agent = SmartAggregatorAgent(
+            llm_client,
+            quorum=settings.AGGREGATOR_QUORUM,
+            time_budget=settings.AGGREGATOR_TIME_BUDGET,
+            refine_late=settings.AGGREGATOR_REFINE_LATE,
+            summary_cache=self.summary_cache,
+            generic_summaries=settings.SUMMARY_CACHE_GENERIC,
+        )
+        self.cleaner_agent = ContentCleanerAgent(
+            max_link_density=settings.CLEANING_MAX_LINK_DENSITY,
+            max_prompt_chars=self.aggregate_agent.max_input_chars,
+        )
         self.formatter_agent = FormatterAgent(llm_client, self.mongo_db)
 
         # Create graph
@@ -35,12 +96,15 @@ class MultiAgentPipeline:
         self.graph.add_node("TavilySearchAgent", self._safe(self._search_node))
         self.graph.add_node("TavilyExtractAgent", self._safe(self._extract))
         self.graph.add_node("TavilyCrawlAgent", self._safe(self._crawl))
+        self.graph.add_node("ContentCleanerAgent", self._safe(self._clean))
+        self.graph.add_node("DedupAgent", self._safe(self._dedup))
         self.graph.add_node("SmartAggregatorAgent", self._async_safe(self._aggregate))
         self.graph.add_node("FormatterAgent", self._safe(self._format))
 
         # Normal edges
-        self.graph.add_edge("TavilyExtractAgent", "SmartAggregatorAgent")
-        self.graph.add_edge("TavilyCrawlAgent", "SmartAggregatorAgent")
+        self.graph.add_edge("TavilyCrawlAgent", "ContentCleanerAgent")
+        self.graph.add_edge("ContentCleanerAgent", "DedupAgent")
+        self.graph.add_edge("DedupAgent", "SmartAggregatorAgent")
         self.graph.add_edge("SmartAggregatorAgent", "FormatterAgent")
 
         # Conditional routing
@@ -57,16 +121,27 @@ class MultiAgentPipeline:
         )
 
         def _route_after_search(state: Dict):
-            if state.get("high_score_urls"):
+            if state.get("extract_urls"):
                 return "TavilyExtractAgent"
-            if state.get("mid_score_urls"):
+            if state.get("crawl_urls"):
                 return "TavilyCrawlAgent"
-            return "SmartAggregatorAgent"
+            return "ContentCleanerAgent"
 
         self.graph.add_conditional_edges(
             "TavilySearchAgent",
             self._safe(_route_after_search),
-            {"TavilyExtractAgent": "TavilyExtractAgent", "TavilyCrawlAgent": "TavilyCrawlAgent", "SmartAggregatorAgent": "SmartAggregatorAgent"}
+            {"TavilyExtractAgent": "TavilyExtractAgent", "TavilyCrawlAgent": "TavilyCrawlAgent", "ContentCleanerAgent": "ContentCleanerAgent"}
+        )
+
+        def _route_after_extract(state: Dict):
+            if state.get("crawl_urls") and self._crawl_fits_budget(state):
+                return "TavilyCrawlAgent"
+            return "ContentCleanerAgent"
+
+        self.graph.add_conditional_edges(
+            "TavilyExtractAgent",
+            self._safe(_route_after_extract),
+            {"TavilyCrawlAgent": "TavilyCrawlAgent", "ContentCleanerAgent": "ContentCleanerAgent"}
         )
 
         # Entry/finish
@@ -78,14 +153,21 @@ class MultiAgentPipeline:
     def _safe(self, fn):
         def wrapped(state: Dict):
             start = time.perf_counter()
+            profile = state.get("profile")
+            cpu_start = time.thread_time() if profile is not None else 0.0
             try:
-                new_state = fn(state)
+                with profiling.node_context(profile, fn.__name__):
+                    new_state = fn(state)
+            except AdmissionRejected:
+                raise
             except Exception as e:
                 new_state = state
                 new_state["error"] = f"An error occurred: {e}"
             finally:
                 elapsed = time.perf_counter() - start
                 print(f"[TIMER] {fn.__name__} took {elapsed:.3f} seconds")
+                if profile is not None:
+                    profile.record_node(fn.__name__, elapsed * 1000, (time.thread_time() - cpu_start) * 1000)
             return new_state
         return wrapped
 
@@ -93,17 +175,24 @@ class MultiAgentPipeline:
         """Wrap node function which might return coroutine"""
         def wrapped(state: Dict):
             start = time.perf_counter()
+            profile = state.get("profile")
+            cpu_start = time.thread_time() if profile is not None else 0.0
             try:
-                result = fn(state)
-                if asyncio.iscoroutine(result):
-                    result = asyncio.run(result)
+                with profiling.node_context(profile, fn.__name__):
+                    result = fn(state)
+                    if asyncio.iscoroutine(result):
+                        result = asyncio.run(result)
                 new_state = result
+            except AdmissionRejected:
+                raise
             except Exception as e:
                 new_state = state
                 new_state["error"] = f"Async node error: {e}"
             finally:
                 elapsed = time.perf_counter() - start
                 print(f"[TIMER] {fn.__name__} took {elapsed:.3f} seconds")
+                if profile is not None:
+                    profile.record_node(fn.__name__, elapsed * 1000, (time.thread_time() - cpu_start) * 1000)
             return new_state
         return wrapped
 
@@ -123,33 +212,104 @@ class MultiAgentPipeline:
         query = classified.get("assistant_message", "")
         mode = classified.get("mode", "competitor")
         results = self.search_agent.search(query, mode)
+
+        # Local hits already carry their text; they go straight to aggregation
+        local = [r for r in results if r.get("source") == "local"]
+        results = [r for r in results if r.get("source") != "local"]
+        state["docs"] = self._store_docs(state, [
+            {"url": r["url"], "text": r["raw_content"], "topic": r["topic"], "title": r.get("title", ""), "source": "local"}
+            for r in local
+        ])
+        state["url_with_topics"] = [{"url": r["url"], "topic": r["topic"]} for r in local]
         state["search_results"] = results
-        high_score_urls = [{"url": r["url"], "topic": r.get("topic", "general")} for r in results if r.get("score",0) > 0.7]
-        mid_score_urls = [{"url": r["url"], "topic": r.get("topic", "general")} for r in results if 0.5 <= r.get("score",0) <=0.7]
-        state["high_score_urls"] = high_score_urls if high_score_urls else None
-        state["mid_score_urls"] = mid_score_urls if mid_score_urls else None
+
+        # Pick extract or crawl per URL from observed domain yield and latency
+        extract_urls, crawl_urls = [], []
+        for r in results:
+            strategy = self.routing_model.choose(r["url"], r.get("score", 0))
+            item = {"url": r["url"], "topic": r.get("topic", "general")}
+            if strategy == "extract":
+                extract_urls.append(item)
+            elif strategy == "crawl":
+                crawl_urls.append(item)
+            else:
+                print(f"[ROUTING] skipping {r['url']}: domain historically yields nothing")
+
+        # Extract and crawl run one after the other. Without evidence for crawling a URL,
+        # keep to one strategy per query, as the plain score thresholds did
+        if extract_urls:
+            crawl_urls = [item for item in crawl_urls if self.routing_model.has_history(item["url"])]
+        state["fetch_deadline"] = time.perf_counter() + settings.FETCH_LATENCY_BUDGET
+        state["extract_urls"] = extract_urls if extract_urls else None
+        state["crawl_urls"] = crawl_urls if crawl_urls else None
         return state
 
     def _extract(self, state: Dict) -> Dict:
         if state.get("error"):
             return state
-        urls = state.get("high_score_urls", [])
+        urls = state.get("extract_urls", [])
         if urls:
-            state["docs"] = list(self.extract_agent.extract(urls))
-            state["url_with_topics"] = urls
-        else:
-            state["docs"] = []
+            docs, failed = self.extract_agent.extract(urls)
+            state["docs"] = state.get("docs", []) + self._store_docs(state, docs)
+            # URLs extract could not fetch get a second chance through crawl
+            crawl_urls = state.get("crawl_urls") or []
+            queued = {item["url"] for item in crawl_urls}
+            fallback = [item for item in failed if item["url"] not in queued]
+            if fallback:
+                state["crawl_urls"] = crawl_urls + fallback
+            failed_urls = {item["url"] for item in fallback}
+            state["url_with_topics"] = state.get("url_with_topics", []) + [u for u in urls if u["url"] not in failed_urls]
         return state
 
     def _crawl(self, state: Dict) -> Dict:
         if state.get("error"):
             return state
-        urls = state.get("mid_score_urls", [])
+        urls = state.get("crawl_urls", [])
         if urls:
-            state["docs"] = list(self.crawl_agent.crawl(urls))
-            state["url_with_topics"] = urls
-        else:
-            state["docs"] = []
+            state["docs"] = state.get("docs", []) + self._store_docs(state, self.crawl_agent.crawl(urls))
+            state["url_with_topics"] = state.get("url_with_topics", []) + urls
+        return state
+
+    def _crawl_fits_budget(self, state: Dict) -> bool:
+        """
+        Whether the crawl after extract is expected to finish within the fetch
+        phase's FETCH_LATENCY_BUDGET. With nothing fetched yet it always runs.
+        """
+        deadline = state.get("fetch_deadline")
+        if deadline is None or not state.get("docs"):
+            return True
+        items = state["crawl_urls"][:self.crawl_agent.max_urls]
+        expected = max(self.routing_model.estimate(item["url"], "crawl")["latency"] for item in items)
+        remaining = deadline - time.perf_counter()
+        if expected <= remaining:
+            return True
+        print(f"[ROUTING] skipping crawl of {len(items)} URLs: expected {expected:.1f}s, {max(remaining, 0):.1f}s of fetch budget left")
+        return False
+
+    def _store_docs(self, state: Dict, docs):
+        """Move document text into the request's arena; the state keeps only handles."""
+        arena = state.get("arena")
+        return arena.add_all(docs) if arena is not None else list(docs)
+
+    def _clean(self, state: Dict) -> Dict:
+        if state.get("error") or not settings.CLEANING_ENABLED:
+            return state
+        docs = state.get("docs", [])
+        if docs:
+            texts, state["cleaning"] = self.cleaner_agent.clean(docs)
+            arena = state.get("arena")
+            if arena is not None and all(hasattr(doc, "materialize") for doc in docs):
+                # The arena now holds only the cleaned text; the raw pages are freed
+                arena.rewrite(docs, texts)
+            else:
+                state["docs"] = [{**doc, "text": text, "content_hash": SummaryCache.content_hash(doc.get("text"))}
+                                 for doc, text in zip(docs, texts)]
+        return state
+
+    def _dedup(self, state: Dict) -> Dict:
+        if state.get("error"):
+            return state
+        state["docs"] = self.dedup_agent.dedup(state.get("docs", []))
         return state
 
 
@@ -189,9 +349,12 @@ class MultiAgentPipeline:
                     loop.close()
 
             with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(run_async_in_thread)
+                future = executor.submit(profiling.bind(run_async_in_thread, "loop"))
                 state["aggregated"] = future.result()
 
+        except AdmissionRejected:
+            # OpenAI saturated: surface 429/503 rather than an "Aggregator error" answer
+            raise
         except Exception as e:
             state["aggregated"] = []
             state["error"] = f"Aggregator error: {e}"
@@ -200,27 +363,72 @@ class MultiAgentPipeline:
 
 
     def _format(self, state: Dict) -> Dict:
+        # Keep the query log id and cleaning stats so run_pipeline can record the request metrics
+        return {
+            "output": self._build_output(state),
+            "query_log_id": state.get("classified", {}).get("log_id"),
+            "cleaning": state.get("cleaning"),
+        }
+
+    def _build_output(self, state: Dict) -> Dict:
         if state.get("error"):
-            return {"output": {"type":"text","content":state["error"],"meta":{}}}
+            return {"type":"text","content":state["error"],"meta":{}}
         final_response = state.get("final_response")
         if final_response is not None:
-            return {"output": {"type":"text","content":final_response,"meta":{"short_circuit":True}}}
+            return {"type":"text","content":final_response,"meta":{"short_circuit":True}}
         aggregated = state.get("aggregated", {})
         if not aggregated:
-            return {"output":{"type":"text","content":"Didn't find any relevant information.","meta":{}}}
+            return {"type":"text","content":"Didn't find any relevant information.","meta":{}}
         query = state.get("classified",{}).get("assistant_message","")
         formatted = self.formatter_agent.format(query, aggregated)
         content_blocks = formatted.get("content_blocks", [])
         if not content_blocks:
             content_blocks = [{"type":"paragraph","text":formatted.get("summary","Didn't find any relevant information.")}]
-        return {"output": {"type":"mixed" if len(content_blocks)>1 else "text","content":content_blocks if len(content_blocks)>1 else content_blocks[0]["text"],"meta":{"urls":[d.get("url") for d in state.get("url_with_topics",[])]}}}
+        return {"type":"mixed" if len(content_blocks)>1 else "text","content":content_blocks if len(content_blocks)>1 else content_blocks[0]["text"],"meta":{"urls":[d.get("url") for d in state.get("url_with_topics",[])]}}
 
-    def run_pipeline(self, query: str):
-        inputs = {"query": query}
+    def run_pipeline(self, query: str, profile: bool = False):
+        """
+        profile: sample this run's stacks and per-node wall/CPU time; the
+                 result then carries "profile_id" for /debug/profiles
+        """
+        arena = ContentArena()
+        request_profile = profiling.start_profile(query) if profile else None
+        inputs = {"query": query, "arena": arena, "profile": request_profile}
+        start = time.perf_counter()
         try:
             result = self.app.invoke(inputs)
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return {"status":"error","message":"An error occurred while processing your request."}
+        finally:
+            print(f"[ARENA] {arena.count} docs, {arena.nbytes} bytes released")
+            arena.release()
+            if request_profile is not None:
+                profiling.finish_profile(request_profile)
+        log_id = result.get("query_log_id") or result.get("classified", {}).get("log_id")
+        self._record_metrics(log_id, (time.perf_counter() - start) * 1000, "output" in result, result.get("cleaning"))
         if "output" not in result:
-            return {"status":"error","message":result.get("error","An error occurred while processing your request.")}
-        return {"status":"success","data":result["output"]}
+            response = {"status":"error","message":result.get("error","An error occurred while processing your request.")}
+        else:
+            response = {"status":"success","data":result["output"]}
+        if request_profile is not None:
+            response["profile_id"] = request_profile.id
+        return response
+
+    def _record_metrics(self, log_id, latency_ms: float, ok: bool, cleaning: Dict = None):
+        """Attach end-to-end latency and prompt size to the query log entry, off the request path."""
+        if log_id is None:
+            return
+        fields = {"latency_ms": round(latency_ms, 1), "ok": ok}
+        if cleaning:
+            fields["prompt_chars_in"] = cleaning["prompt_chars_in"]
+            fields["prompt_chars_out"] = cleaning["prompt_chars_out"]
+
+        def update():
+            try:
+                self.mongo_db["query_logs"].update_one({"_id": log_id}, {"$set": fields})
+            except Exception as e:
+                print("Mongo latency update failed:", e)
+
+        self.log_executor.submit(update)
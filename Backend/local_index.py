@@ -0,0 +1,215 @@
+# local_index.py
+import os
+import re
+import gzip
+import json
+import math
+import time
+import threading
+from typing import Dict, List
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LocalIndex:
+    """
+    Incrementally updated BM25 index over documents we already fetched.
+
+    Extract/crawl results are added in the background; re-adding a URL
+    replaces the old version. The oldest documents are evicted beyond
+    max_docs. Documents are persisted as gzipped JSON and the postings are
+    rebuilt on load.
+    """
+
+    STOPWORDS = frozenset(
+        "a an and are as at be by for from has have how in is it its of on or that the their this "
+        "to was what when which who why will with".split()
+    )
+    _WORD = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, path: str = None, max_docs: int = 2000, max_chars: int = 20000,
+                 k1: float = 1.5, b: float = 0.75, save_interval: int = 60):
+        """
+        path: gzipped JSON file to persist to ("" or None keeps the index in memory only)
+        max_docs: documents kept before the oldest are evicted
+        max_chars: text stored per document (what the aggregator would use)
+        """
+        self.path = path
+        self.max_docs = max_docs
+        self.max_chars = max_chars
+        self.k1 = k1
+        self.b = b
+        self.save_interval = save_interval
+
+        self._docs = {}        # url -> {"id", "url", "title", "topic", "text", "fetched_at"}
+        self._by_id = {}       # id -> url
+        self._terms = {}       # id -> distinct terms (for removal)
+        self._lengths = {}     # id -> number of terms
+        self._postings = {}    # term -> {id: tf}
+        self._total_len = 0
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._last_save = time.time()
+        self._dirty = False
+        self._loading = None
+
+        if self.path and os.path.exists(self.path):
+            # Rebuilding postings takes a while for a large index; don't hold up startup
+            self._loading = self._writer.submit(self.load)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def wait_loaded(self, timeout: float = None):
+        """Block until the background load started at construction (if any) has finished."""
+        if self._loading is not None:
+            self._loading.result(timeout)
+
+    # ---------------- Updates ----------------
+    def schedule_add(self, docs: List[Dict]):
+        """Index documents off the request path."""
+        if docs:
+            self._writer.submit(self._add_and_maybe_save, list(docs))
+
+    def add_documents(self, docs: List[Dict], fetched_at: float = None):
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            for doc in docs:
+                text = (doc.get("text") or "")[:self.max_chars]
+                url = doc.get("url")
+                if not url or not text:
+                    continue
+                self._remove(url)
+                self._insert({
+                    "url": url,
+                    "title": doc.get("title", ""),
+                    "topic": doc.get("topic", "general"),
+                    "text": text,
+                    "fetched_at": doc.get("fetched_at", fetched_at),
+                })
+            while len(self._docs) > self.max_docs:
+                self._remove(next(iter(self._docs)))
+            self._dirty = True
+
+    # ---------------- Retrieval ----------------
+    def search(self, query: str, topic: str = None, k: int = 5, max_age: float = None) -> List[Dict]:
+        """
+        BM25 top-k. Each hit carries "coverage" (share of query terms it contains)
+        and a "score" normalized to the best hit.
+        """
+        terms = set(self._tokenize(query))
+        if not terms:
+            return []
+        now = time.time()
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores, matched = {}, Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+                    matched[doc_id] += 1
+
+            hits = []
+            for doc_id, score in sorted(scores.items(), key=lambda x: x[1], reverse=True):
+                doc = self._docs[self._by_id[doc_id]]
+                if topic and doc["topic"] != topic:
+                    continue
+                if max_age is not None and now - doc["fetched_at"] > max_age:
+                    continue
+                hits.append({**doc, "bm25": score, "coverage": matched[doc_id] / len(terms)})
+                if len(hits) >= k:
+                    break
+
+        best = hits[0]["bm25"] if hits else 1.0
+        for hit in hits:
+            hit["score"] = hit["bm25"] / best
+        return hits
+
+    # ---------------- Persistence ----------------
+    def save(self):
+        if not self.path:
+            return
+        # The writer thread and shutdown may both save; they share the .tmp file
+        with self._save_lock:
+            with self._lock:
+                docs = list(self._docs.values())
+                self._dirty = False
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump([{k: v for k, v in d.items() if k != "id"} for d in docs], f)
+            os.replace(tmp_path, self.path)
+            self._last_save = time.time()
+
+    def load(self):
+        """
+        Rebuild the index from disk into a separate instance, then swap it in,
+        so searches are not blocked while the postings are rebuilt. Documents
+        indexed while loading are newer and replace their stored versions.
+        """
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                docs = json.load(f)
+            fresh = LocalIndex(max_docs=self.max_docs, max_chars=self.max_chars, k1=self.k1, b=self.b)
+            for doc in docs:
+                fresh._insert(doc)
+            with self._lock:
+                for doc in self._docs.values():
+                    fresh._remove(doc["url"])
+                    fresh._insert({k: v for k, v in doc.items() if k != "id"})
+                while len(fresh._docs) > self.max_docs:
+                    fresh._remove(next(iter(fresh._docs)))
+                self._docs, self._by_id, self._terms = fresh._docs, fresh._by_id, fresh._terms
+                self._lengths, self._postings = fresh._lengths, fresh._postings
+                self._total_len, self._next_id = fresh._total_len, fresh._next_id
+            fresh._writer.shutdown(wait=False)
+            print(f"[LOCAL INDEX] loaded {len(docs)} documents from {self.path}")
+        except Exception as e:
+            print(f"Failed to load local index from {self.path}: {e}")
+
+    # ---------------- Helper Methods ----------------
+    def _tokenize(self, text: str) -> List[str]:
+        return [t for t in self._WORD.findall((text or "").lower()) if t not in self.STOPWORDS]
+
+    def _insert(self, doc: Dict):
+        doc_id = self._next_id
+        self._next_id += 1
+        counts = Counter(self._tokenize(f"{doc.get('title', '')} {doc['text']}"))
+        self._docs[doc["url"]] = {**doc, "id": doc_id}
+        self._by_id[doc_id] = doc["url"]
+        self._terms[doc_id] = tuple(counts)
+        self._lengths[doc_id] = sum(counts.values())
+        self._total_len += self._lengths[doc_id]
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def _remove(self, url: str):
+        doc = self._docs.pop(url, None)
+        if doc is None:
+            return
+        doc_id = doc["id"]
+        del self._by_id[doc_id]
+        self._total_len -= self._lengths.pop(doc_id)
+        for term in self._terms.pop(doc_id):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _add_and_maybe_save(self, docs: List[Dict]):
+        try:
+            self.add_documents(docs)
+            if self._dirty and time.time() - self._last_save >= self.save_interval:
+                self.save()
+        except Exception as e:
+            print(f"Local indexing failed: {e}")
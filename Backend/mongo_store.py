@@ -0,0 +1,167 @@
+# mongo_store.py
+from typing import Dict, List
+from datetime import datetime, timedelta
+from pymongo.errors import OperationFailure
+
+LOG_COLLECTIONS = ("query_logs", "response_logs")
+LATENCY_SAMPLE = 5000  # most recent latencies the percentiles are taken from without $percentile
+
+_percentile_supported = None  # learned from the server on first use
+
+
+def ensure_collections(mongo_db, retention_days: int = 30, capped_mb: int = 0):
+    """
+    Create indexes and retention policy for the log collections.
+
+    retention_days: TTL on `timestamp` (0 keeps documents forever)
+    capped_mb: when > 0, log collections that don't exist yet are created capped
+               to this size instead of using a TTL (MongoDB disallows both)
+    """
+    ttl_seconds = retention_days * 86400 if retention_days > 0 else None
+    existing = set(mongo_db.list_collection_names())
+
+    for name in LOG_COLLECTIONS:
+        if capped_mb > 0 and name not in existing:
+            mongo_db.create_collection(name, capped=True, size=capped_mb * 1024 * 1024)
+            existing.add(name)
+        capped = name in existing and mongo_db[name].options().get("capped", False)
+        if capped_mb > 0 and not capped:
+            print(f"[MONGO] {name} already exists uncapped; keeping TTL retention")
+        _ensure_timestamp_index(mongo_db, name, None if capped else ttl_seconds)
+
+    mongo_db["query_logs"].create_index([("mode", 1), ("timestamp", -1)])
+    mongo_db["query_logs"].create_index([("normalized_query", 1), ("timestamp", -1)])
+    mongo_db["response_logs"].create_index([("normalized_query", 1), ("timestamp", -1)])
+
+
+def query_stats(mongo_db, hours: int = 24, top_n: int = 10) -> Dict:
+    """
+    Top queries, mode mix, latency percentiles and prompt size saved by
+    content cleaning over the last `hours`,
+    answered by a single aggregation over the indexed query log.
+
+    Latency percentiles use $percentile (MongoDB 7.0+); older servers get
+    them from the LATENCY_SAMPLE most recent requests, so memory stays bounded.
+    """
+    global _percentile_supported
+    since = datetime.utcnow() - timedelta(hours=hours)
+    facets = None
+    if _percentile_supported is not False:
+        try:
+            facets = _aggregate_stats(mongo_db, since, top_n, _latency_percentile_facet())
+            _percentile_supported = True
+        except OperationFailure as e:
+            if _percentile_supported:
+                raise
+            print("[MONGO] $percentile not supported, using a bounded latency sample:", e)
+            _percentile_supported = False
+    if facets is None:
+        facets = _aggregate_stats(mongo_db, since, top_n, _latency_sample_facet())
+
+    total = facets.get("total") or [{}]
+    latency = facets.get("latency") or [{}]
+    cleaning = facets.get("cleaning") or [{}]
+    return {
+        "window_hours": hours,
+        "total_queries": total[0].get("count", 0),
+        "top_queries": [{"query": t["_id"], "count": t["count"]} for t in facets.get("top_queries", [])],
+        "modes": {m["_id"]: m["count"] for m in facets.get("modes", [])},
+        "latency_ms": latency[0],
+        "prompt_cleaning": cleaning[0],
+    }
+
+
+# ---------------- Helper Methods ----------------
+def _aggregate_stats(mongo_db, since: datetime, top_n: int, latency_facet: List[Dict]) -> Dict:
+    pipeline = [
+        {"$match": {"timestamp": {"$gte": since}}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "top_queries": [
+                {"$group": {"_id": "$normalized_query", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": top_n},
+            ],
+            "modes": [
+                {"$group": {"_id": "$mode", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+            ],
+            "latency": latency_facet,
+            "cleaning": [
+                {"$match": {"prompt_chars_in": {"$gt": 0}}},
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "chars_in": {"$sum": "$prompt_chars_in"},
+                    "chars_out": {"$sum": "$prompt_chars_out"},
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "count": 1,
+                    "avg_prompt_chars_in": {"$round": [{"$divide": ["$chars_in", "$count"]}, 0]},
+                    "avg_prompt_chars_out": {"$round": [{"$divide": ["$chars_out", "$count"]}, 0]},
+                    "reduction": {"$round": [{"$subtract": [1, {"$divide": ["$chars_out", "$chars_in"]}]}, 3]},
+                }},
+            ],
+        }},
+    ]
+    return next(mongo_db["query_logs"].aggregate(pipeline, allowDiskUse=True), {})
+
+
+def _latency_percentile_facet() -> List[Dict]:
+    return [
+        {"$match": {"latency_ms": {"$exists": True}}},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "p": {"$percentile": {"input": "$latency_ms", "p": [0.5, 0.9, 0.99], "method": "approximate"}},
+            "max": {"$max": "$latency_ms"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "count": 1,
+            "p50": {"$arrayElemAt": ["$p", 0]},
+            "p90": {"$arrayElemAt": ["$p", 1]},
+            "p99": {"$arrayElemAt": ["$p", 2]},
+            "max": 1,
+        }},
+    ]
+
+
+def _latency_sample_facet() -> List[Dict]:
+    def percentile(p):
+        index = {"$toInt": {"$floor": {"$multiply": [p, {"$subtract": [{"$size": "$values"}, 1]}]}}}
+        return {"$arrayElemAt": ["$values", index]}
+
+    return [
+        {"$match": {"latency_ms": {"$exists": True}}},
+        {"$sort": {"timestamp": -1}},
+        {"$limit": LATENCY_SAMPLE},
+        {"$sort": {"latency_ms": 1}},
+        {"$group": {"_id": None, "values": {"$push": "$latency_ms"}}},
+        {"$project": {
+            "_id": 0,
+            "count": {"$size": "$values"},
+            "p50": percentile(0.5),
+            "p90": percentile(0.9),
+            "p99": percentile(0.99),
+            "max": {"$max": "$values"},
+        }},
+    ]
+
+
+def _ensure_timestamp_index(mongo_db, name: str, ttl_seconds):
+    if ttl_seconds:
+        ensure_ttl_index(mongo_db, name, "timestamp", ttl_seconds)
+    else:
+        mongo_db[name].create_index([("timestamp", -1)])
+
+
+def ensure_ttl_index(mongo_db, name: str, field: str, ttl_seconds: int):
+    """Create a TTL index, or change the expiry of an existing one in place."""
+    for index in mongo_db[name].list_indexes():
+        if dict(index["key"]) == {field: 1}:
+            if index.get("expireAfterSeconds") != ttl_seconds:
+                mongo_db.command("collMod", name, index={"keyPattern": {field: 1}, "expireAfterSeconds": ttl_seconds})
+            return
+    mongo_db[name].create_index([(field, 1)], expireAfterSeconds=ttl_seconds)
@@ -0,0 +1,233 @@
+# profiling.py
+import os
+import sys
+import hmac
+import time
+import uuid
+import random
+import threading
+from typing import Dict, List, Optional
+from contextlib import contextmanager
+from collections import Counter, OrderedDict
+from config import settings
+
+
+class RequestProfile:
+    """
+    Sampling profile of one pipeline run.
+
+    A sampler thread walks the stacks of the registered threads every
+    `interval` seconds (wall-clock sampling, so time spent waiting on the
+    network shows up in the socket frames). Graph nodes also record their
+    wall and CPU time separately. Work a node hands to pool threads is
+    registered through bind(), so those threads are sampled too and their
+    CPU time counts toward the node.
+    """
+
+    def __init__(self, query: str, interval: float, max_depth: int = 64):
+        self.id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.interval = interval
+        self.max_depth = max_depth
+        self.started_at = time.time()
+        self.wall_ms = None
+        self.samples = Counter()  # tuple of frame labels (root first) -> count
+        self.nodes = []           # [{"node", "wall_ms", "cpu_ms"}]
+        self._threads = {}        # thread id -> label
+        self._extra_cpu = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+
+    # ---------------- Recording ----------------
+    def start(self):
+        self.add_thread(threading.get_ident(), "pipeline")
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.wall_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def add_thread(self, thread_id: int, label: str):
+        with self._lock:
+            self._threads[thread_id] = label
+
+    def remove_thread(self, thread_id: int):
+        with self._lock:
+            self._threads.pop(thread_id, None)
+
+    def add_cpu(self, node: str, cpu_ms: float):
+        """CPU spent by a helper thread on behalf of a node (added to its next record)."""
+        with self._lock:
+            self._extra_cpu[node] += cpu_ms
+
+    def record_node(self, node: str, wall_ms: float, cpu_ms: float):
+        with self._lock:
+            cpu_ms += self._extra_cpu.pop(node, 0.0)
+            self.nodes.append({"node": node, "wall_ms": round(wall_ms, 2), "cpu_ms": round(cpu_ms, 2)})
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for thread_id, label in threads:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(f"thread:{label}")
+                self.samples[tuple(reversed(stack))] += 1
+            del frames
+
+    # ---------------- Export ----------------
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "query": self.query,
+            "started_at": self.started_at,
+            "wall_ms": self.wall_ms,
+            "samples": sum(self.samples.values()),
+            "interval_ms": self.interval * 1000,
+            "nodes": self.nodes,
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed-stack format (flamegraph.pl, speedscope, inferno)."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common())
+
+    def speedscope(self) -> Dict:
+        frames, index = [], {}
+        samples, weights = [], []
+        interval_ms = self.interval * 1000
+        for stack, count in self.samples.items():
+            ids = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(count * interval_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.id}: {self.query}",
+            "exporter": "ci_bot profiling",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.query,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfileStore:
+    """Most recent profiles, kept in memory for /debug/profiles."""
+
+    def __init__(self, max_profiles: int = 50):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [p.summary() for p in reversed(profiles)]
+
+
+store = ProfileStore(settings.PROFILE_HISTORY)
+_current = threading.local()  # .node = (profile, node name) while a profiled node runs on this thread
+
+
+@contextmanager
+def node_context(profile: Optional[RequestProfile], node: str):
+    """Mark the current thread as running `node` of `profile`, for bind() calls made from it."""
+    previous = getattr(_current, "node", None)
+    _current.node = (profile, node) if profile is not None else None
+    try:
+        yield
+    finally:
+        _current.node = previous
+
+
+@contextmanager
+def worker(profile: RequestProfile, node: str, label: str):
+    """Sample this thread and add its CPU time to `node` while the block runs."""
+    thread_id = threading.get_ident()
+    profile.add_thread(thread_id, label)
+    cpu_start = time.thread_time()
+    try:
+        with node_context(profile, node):
+            yield
+    finally:
+        profile.remove_thread(thread_id)
+        profile.add_cpu(node, (time.thread_time() - cpu_start) * 1000)
+
+
+def bind(fn, label: str = "worker"):
+    """
+    Wrap fn for another thread (executor.submit / run_in_executor), so that
+    in a profiled node it is sampled and its CPU time counted for that node.
+    Outside a profiled node, fn is returned as is.
+    """
+    context = getattr(_current, "node", None)
+    if context is None:
+        return fn
+    profile, node = context
+
+    def bound(*args, **kwargs):
+        with worker(profile, node, f"{node}:{label}"):
+            return fn(*args, **kwargs)
+    return bound
+
+
+def authorized(token: Optional[str]) -> bool:
+    """Whether a request carries PROFILE_DEBUG_TOKEN (never true while it is unset)."""
+    expected = settings.PROFILE_DEBUG_TOKEN
+    return bool(expected) and bool(token) and hmac.compare_digest(token, expected)
+
+
+def should_profile(header_value: Optional[str], token: Optional[str] = None) -> bool:
+    """
+    Profile when an authorized request asks for it, or when the run falls in
+    the anonymous sample rate.
+    """
+    if header_value and header_value.lower() in ("1", "true", "yes") and authorized(token):
+        return True
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def start_profile(query: str) -> RequestProfile:
+    profile = RequestProfile(query, settings.PROFILE_INTERVAL_MS / 1000)
+    profile.start()
+    return profile
+
+
+def finish_profile(profile: RequestProfile):
+    profile.stop()
+    store.add(profile)
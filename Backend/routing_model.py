@@ -0,0 +1,129 @@
+# routing_model.py
+import time
+import random
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class RoutingModel:
+    """
+    Per-domain cost model for choosing how to fetch a URL.
+
+    Every extract/crawl outcome updates decayed per-(domain, strategy) totals
+    of attempts, successes, useful characters and latency. choose() picks the
+    strategy with the highest expected useful characters whose expected latency
+    fits the budget, and skips domains where both strategies keep yielding nothing.
+    With no history the search score decides, as before (>0.7 extract, else crawl).
+
+    A skipped domain gets no new observations, so evidence also fades with
+    time (half_life) and a small share of skips are retried (explore_rate);
+    a domain that failed during an outage is not written off for good.
+    """
+
+    STRATEGIES = ("extract", "crawl")
+    PRIOR = {
+        "extract": {"success": 0.8, "chars": 3000.0, "latency": 2.0},
+        "crawl": {"success": 0.8, "chars": 3000.0, "latency": 6.0},
+    }
+
+    def __init__(self, latency_budget: float = 8.0, min_useful_chars: int = 200, prior_weight: float = 2.0,
+                 min_observations: float = 3.0, decay: float = 0.95, default_bonus: float = 1.25,
+                 half_life: float = 1800.0, explore_rate: float = 0.05):
+        """
+        latency_budget: seconds a fetch strategy may be expected to take
+        min_useful_chars: observed chars per attempt under which a strategy is considered useless
+        prior_weight: how many observations the prior is worth
+        min_observations: observations per strategy before a domain may be skipped
+        decay: weight kept by older observations at each new one
+        default_bonus: preference for the score-based default when estimates are close
+        half_life: seconds after which a domain's observations count half
+        explore_rate: share of skip decisions that fetch anyway, to notice recovery
+        """
+        self.latency_budget = latency_budget
+        self.min_useful_chars = min_useful_chars
+        self.prior_weight = prior_weight
+        self.min_observations = min_observations
+        self.decay = decay
+        self.default_bonus = default_bonus
+        self.half_life = half_life
+        self.explore_rate = explore_rate
+        self._stats = {}    # (domain, strategy) -> {"n", "success", "chars", "latency"}
+        self._updated = {}  # (domain, strategy) -> time of the last observation
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def domain(url: str) -> str:
+        netloc = urlparse(url or "").netloc.lower()
+        return netloc[4:] if netloc.startswith("www.") else netloc
+
+    def record(self, url: str, strategy: str, success: bool, useful_chars: int, latency: float):
+        key = (self.domain(url), strategy)
+        now = time.time()
+        with self._lock:
+            s = self._aged(key, now)
+            for field in s:
+                s[field] *= self.decay
+            self._stats[key] = s
+            self._updated[key] = now
+            s["n"] += 1
+            s["success"] += 1 if success else 0
+            s["chars"] += useful_chars
+            s["latency"] += latency
+
+    def estimate(self, url: str, strategy: str) -> Dict:
+        """
+        Smoothed success rate, useful chars per success, latency and expected yield,
+        plus the raw observed yield per attempt.
+        """
+        prior = self.PRIOR[strategy]
+        w = self.prior_weight
+        with self._lock:
+            s = self._aged((self.domain(url), strategy), time.time())
+        success = (prior["success"] * w + s["success"]) / (w + s["n"])
+        chars = (prior["chars"] * prior["success"] * w + s["chars"]) / (prior["success"] * w + s["success"])
+        latency = (prior["latency"] * w + s["latency"]) / (w + s["n"])
+        observed = s["chars"] / s["n"] if s["n"] else None
+        return {"n": s["n"], "success": success, "chars": chars, "latency": latency,
+                "expected_chars": success * chars, "observed_chars": observed}
+
+    def has_history(self, url: str) -> bool:
+        """Whether any (still relevant) outcome was recorded for the URL's domain."""
+        now = time.time()
+        domain = self.domain(url)
+        with self._lock:
+            return any(self._aged((domain, strategy), now)["n"] >= 1 for strategy in self.STRATEGIES)
+
+    def choose(self, url: str, score: float) -> Optional[str]:
+        """Return "extract", "crawl", or None to skip the URL."""
+        default = "extract" if score > 0.7 else "crawl"
+        estimates = {strategy: self.estimate(url, strategy) for strategy in self.STRATEGIES}
+
+        if all(e["n"] >= self.min_observations and e["observed_chars"] < self.min_useful_chars
+               for e in estimates.values()):
+            if random.random() >= self.explore_rate:
+                return None
+            return default
+
+        feasible = [s for s, e in estimates.items() if e["latency"] <= self.latency_budget]
+        if not feasible:
+            return min(estimates, key=lambda s: estimates[s]["latency"])
+
+        def value(strategy):
+            v = estimates[strategy]["expected_chars"]
+            return v * self.default_bonus if strategy == default else v
+
+        return max(feasible, key=value)
+
+    def _aged(self, key, now: float) -> Dict:
+        """Copy of a key's totals, faded by the time since its last observation."""
+        s = self._stats.get(key)
+        if s is None:
+            return {"n": 0.0, "success": 0.0, "chars": 0.0, "latency": 0.0}
+        factor = 0.5 ** ((now - self._updated[key]) / self.half_life) if self.half_life > 0 else 1.0
+        return {field: value * factor for field, value in s.items()}
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            keys = list(self._stats)
+        return {f"{domain}/{strategy}": self.estimate(f"https://{domain}", strategy) for domain, strategy in keys}
@@ -0,0 +1,132 @@
+# runtime.py
+import time
+import asyncio
+from typing import Dict
+from config import settings
+
+
+class Resources:
+    """
+    Process-wide resources, initialized in the FastAPI lifespan.
+
+    Mongo, the OpenAI client, the Tavily client and the pipeline modules are
+    imported and initialized concurrently in worker threads. The pipeline is
+    built once the clients exist. Mongo being unreachable does not block
+    startup: it is reported as unavailable and retried in the background.
+    """
+
+    DEPENDENCIES = ("mongo", "llm", "tavily", "imports", "pipeline", "warmup")
+
+    def __init__(self):
+        self.mongo_client = None
+        self.mongo_db = None
+        self.llm_client = None
+        self.tavily_client = None
+        self.pipeline = None
+        self.status = {name: {"state": "pending"} for name in self.DEPENDENCIES}
+        self.startup_ms = None
+        self._background = []
+
+    @property
+    def ready(self) -> bool:
+        return self.pipeline is not None
+
+    def report(self) -> Dict:
+        return {"ready": self.ready, "startup_ms": self.startup_ms, "dependencies": self.status}
+
+    # ---------------- Lifecycle ----------------
+    async def startup(self, warmup: bool = False):
+        start = time.perf_counter()
+        await asyncio.gather(
+            self._step("mongo", self._init_mongo),
+            self._step("llm", self._init_llm),
+            self._step("tavily", self._init_tavily),
+            self._step("imports", self._import_pipeline),
+        )
+        missing = [name for name in ("mongo", "llm", "tavily", "imports")
+                   if self.status[name]["state"] == "failed" or (name == "mongo" and self.mongo_db is None)]
+        if not missing:
+            await self._step("pipeline", self._build_pipeline)
+        else:
+            self.status["pipeline"] = {"state": "failed", "error": f"missing dependencies: {', '.join(missing)}"}
+
+        self.startup_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"[STARTUP] resources initialized in {self.startup_ms:.1f} ms: {self.status}")
+
+        if self.status["mongo"]["state"] != "ok" and self.mongo_client is not None:
+            self._background.append(asyncio.create_task(self._retry_mongo()))
+        if warmup and self.ready:
+            self._background.append(asyncio.create_task(self._step("warmup", self._warmup)))
+        else:
+            self.status["warmup"] = {"state": "skipped"}
+
+    async def shutdown(self):
+        for task in self._background:
+            task.cancel()
+        if self.pipeline is not None and self.pipeline.local_index is not None:
+            try:
+                await asyncio.to_thread(self.pipeline.local_index.save)
+            except Exception as e:
+                print("Saving local index failed:", e)
+        if self.mongo_client is not None:
+            self.mongo_client.close()
+
+    # ---------------- Initializers (run in worker threads) ----------------
+    def _init_mongo(self):
+        from pymongo import MongoClient
+        from mongo_store import ensure_collections
+
+        self.mongo_client = MongoClient(settings.MONGO_URI, serverSelectionTimeoutMS=settings.MONGO_TIMEOUT_MS)
+        self.mongo_db = self.mongo_client[settings.MONGODB_NAME]
+        self.mongo_client.admin.command("ping")
+        ensure_collections(self.mongo_db, settings.LOG_RETENTION_DAYS, settings.LOG_CAPPED_MB)
+
+    def _init_llm(self):
+        from clients import LLMClient
+        self.llm_client = LLMClient()
+
+    def _init_tavily(self):
+        from clients import TavilyAPIClient
+        self.tavily_client = TavilyAPIClient().client
+
+    def _import_pipeline(self):
+        # Imports langgraph and every agent module, so building the pipeline is compile-only
+        import langgraph_orchestrator  # noqa: F401
+
+    def _build_pipeline(self):
+        from langgraph_orchestrator import MultiAgentPipeline
+        self.pipeline = MultiAgentPipeline(self.llm_client, self.tavily_client, self.mongo_db)
+
+    def _warmup(self):
+        """Prime connections and caches so the first requests don't pay for them."""
+        if self.status["mongo"]["state"] == "ok" and self.pipeline.summary_cache is not None:
+            primed = self.pipeline.summary_cache.prime()
+            print(f"[STARTUP] primed {primed} cached summaries")
+
+    # ---------------- Helper Methods ----------------
+    async def _step(self, name: str, fn):
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(fn)
+            state, error = "ok", None
+        except Exception as e:
+            state, error = ("unavailable" if name == "mongo" else "failed"), str(e)
+        self.status[name] = {"state": state, "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+        if error:
+            self.status[name]["error"] = error
+            print(f"[STARTUP] {name} {state}: {error}")
+
+    async def _retry_mongo(self):
+        """Keep pinging Mongo until it is reachable, then set up collections."""
+        while self.status["mongo"]["state"] != "ok":
+            await asyncio.sleep(settings.MONGO_RETRY_SECONDS)
+
+            def reconnect():
+                from mongo_store import ensure_collections
+                self.mongo_client.admin.command("ping")
+                ensure_collections(self.mongo_db, settings.LOG_RETENTION_DAYS, settings.LOG_CAPPED_MB)
+
+            await self._step("mongo", reconnect)
+
+
+resources = Resources()
@@ -0,0 +1,136 @@
+# summary_cache.py
+import re
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from mongo_store import ensure_ttl_index
+
+
+class SummaryCache:
+    """
+    Caches per-document map summaries of SmartAggregatorAgent.
+
+    Keys combine the content hash of the document as fetched (before cleaning)
+    with the normalized query, so the same page asked with an almost identical
+    question is served without an LLM call. The GENERIC tier stores
+    query-independent summaries keyed by content hash only.
+
+    Lookups hit an in-memory LRU first and then Mongo (TTL indexed).
+    Writes update the LRU immediately and go to Mongo on a background thread.
+    """
+
+    GENERIC = "__generic__"
+    STOPWORDS = frozenset(
+        "a an and are about any as at be by can could do does for from give has have how i in is it "
+        "its latest me new news of on or please recent show tell than that the their there these this "
+        "to update updates what whats when which who why will with".split()
+    )
+    _WORD = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, mongo_db=None, ttl_seconds: int = 21600, lru_size: int = 1024, collection_name: str = "summary_cache"):
+        """
+        mongo_db: database handle, or None for an in-memory only cache
+        ttl_seconds: how long a summary stays valid
+        lru_size: number of summaries kept in process memory
+        """
+        self.mongo_db = mongo_db
+        self.collection_name = collection_name
+        self.collection = mongo_db[collection_name] if mongo_db is not None else None
+        self.ttl_seconds = ttl_seconds
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1) if self.collection is not None else None
+        self._indexes_ready = False
+
+    # ---------------- Keys ----------------
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha1((text or "").encode("utf-8", "ignore")).hexdigest()
+
+    @classmethod
+    def normalize_query(cls, query: str) -> str:
+        """Lowercase, drop stopwords and punctuation, sort terms."""
+        terms = {t for t in cls._WORD.findall((query or "").lower()) if t not in cls.STOPWORDS}
+        return " ".join(sorted(terms))
+
+    def key(self, content_hash: str, query: Optional[str] = None) -> str:
+        normalized = self.normalize_query(query) if query is not None else self.GENERIC
+        return hashlib.sha1(f"{content_hash}|{normalized}".encode("utf-8")).hexdigest()
+
+    # ---------------- Lookup / Store ----------------
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Return {key: summary} for every key found in the LRU or in Mongo."""
+        found, missing = {}, []
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._lru.get(key)
+                if entry and entry[1] > now:
+                    self._lru.move_to_end(key)
+                    found[key] = entry[0]
+                else:
+                    missing.append(key)
+
+        if missing and self.collection is not None:
+            try:
+                cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+                cursor = self.collection.find(
+                    {"_id": {"$in": missing}, "created_at": {"$gte": cutoff}},
+                    {"summary": 1, "created_at": 1},
+                )
+                for doc in cursor:
+                    found[doc["_id"]] = doc.get("summary", "")
+                    age = (datetime.utcnow() - doc["created_at"]).total_seconds()
+                    self._remember(doc["_id"], doc.get("summary", ""), now + self.ttl_seconds - age)
+            except Exception as e:
+                print("Mongo lookup failed in SummaryCache:", e)
+        return found
+
+    def put(self, key: str, summary: str, url: str = ""):
+        """Store a summary; an empty string records that the doc was irrelevant."""
+        self._remember(key, summary, time.time() + self.ttl_seconds)
+        if self._writer is not None:
+            self._writer.submit(self._write, key, summary, url)
+
+    def prime(self, limit: int = 0) -> int:
+        """Load the most recent Mongo entries into the LRU (startup warmup)."""
+        if self.collection is None:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        cursor = self.collection.find({"created_at": {"$gte": cutoff}}).sort("created_at", -1).limit(limit or self.lru_size)
+        count = 0
+        for doc in reversed(list(cursor)):
+            age = (datetime.utcnow() - doc["created_at"]).total_seconds()
+            self._remember(doc["_id"], doc.get("summary", ""), time.time() + self.ttl_seconds - age)
+            count += 1
+        return count
+
+    # ---------------- Helper Methods ----------------
+    def _remember(self, key: str, summary: str, expires_at: float):
+        with self._lock:
+            self._lru[key] = (summary, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _write(self, key: str, summary: str, url: str):
+        if not self._indexes_ready:
+            # Attempted once; an index problem must not cost the writes themselves
+            self._indexes_ready = True
+            try:
+                ensure_ttl_index(self.mongo_db, self.collection_name, "created_at", self.ttl_seconds)
+            except Exception as e:
+                print("Mongo TTL index setup failed in SummaryCache:", e)
+        try:
+            self.collection.replace_one(
+                {"_id": key},
+                {"_id": key, "summary": summary, "url": url, "created_at": datetime.utcnow()},
+                upsert=True,
+            )
+        except Exception as e:
+            print("Mongo write failed in SummaryCache:", e)